@@ -16,7 +16,9 @@ The top level class, NormalExpression, is an abstract class and can not be insta
 
 Some classes are for package use only:
 	- L{ParallelExpression<_ParallelExpression>} is an internal implementation for the subclasses of L{NormalExpression} and their combinations using operators.
-	- L{Closure<_Closure>} and L{Epsilon<_Epsilon>} are accessible using constants.
+	- L{Closure<_Closure>} and L{Epsilon<_Epsilon>} are accessible using constants, and L{counted closures<_Repetition>} using pairs of integers.
+
+L{FreeOrder} builds a sequence of expressions in any order.
 
 
 Supported operations
@@ -63,6 +65,8 @@ To change minimum or maximum occurrences for a reference, these closures can be
 
 	- L{Kleene closure<KLEENE_CLOSURE>}, "C{+}"
 
+	- Counted closure, "C{{m,n}}", with a pair of integers such as C{(2, 4)}, or C{(2, None)} for no maximum
+
 
 Use of closures
 ---------------
@@ -145,6 +149,7 @@ The following statements using operators can be used:
 __docformat__ = "epytext en"
 
 from utilities import Utilities
+import weakref
 
 class NormalExpression(object):
 	"""
@@ -161,6 +166,7 @@ class NormalExpression(object):
 	def to_expression(self):
 		"""
 		Internally simplify the expression into an I{alternative} of I{concatenations}.
+		The items of the concatenations can be alternatives too, so that expressions are kept factored.
 
 		@rtype: NormalExpression
 		"""
@@ -172,6 +178,8 @@ class NormalExpression(object):
 		The resulting expression expresses a sequence of the two operands.
 		M{A + (X|YZ) S{hArr} A + X | A + YZ S{equiv} AX | AYZ}
 
+		The concatenation is not distributed over the alternatives of the operands, which are kept as items of the sequence.
+
 		@param b: The expression to concatenate.
 		@type b: NormalExpression
 		@rtype: NormalExpression
@@ -179,7 +187,7 @@ class NormalExpression(object):
 		if not b: #espilon or None
 			return _ParallelExpression([(self,)])
 		else:
-			return _ParallelExpression([(self,) + conc for conc in b.to_expression()])
+			return _ParallelExpression([(self,) + _items(b)])
 
 	def __or__(self, b):
 		"""
@@ -192,7 +200,7 @@ class NormalExpression(object):
 		@rtype: NormalExpression
 		"""
 		c = [conc for conc in b.to_expression()]
-		c.append([self])
+		c.append((self,))
 		return _ParallelExpression(c)
 
 	def __eq__(self, other):
@@ -312,10 +320,10 @@ class Reference(NormalExpression):
 		@param other: The non-terminal symbol to compare.
 		@type other: Reference
 		@rtype: bool
-		@return: True if the two links are the same.
+		@return: True if the two links are the same, with the same closure.
 		"""
 		if isinstance(other, Reference):
-			return self.reference == other.reference
+			return self.__class__ is other.__class__ and self.reference == other.reference
 		elif other is None:
 			return False
 		else:
@@ -332,11 +340,79 @@ class Reference(NormalExpression):
 
 	def insert_transitions(self, grammar, fsa, initial, final, tag):
 		tag = Utilities.nvl(tag, ())
-		rhs = grammar[self.reference]
-		rhs.insert_transitions(grammar, fsa, initial, final, tag + (self.reference,))
+		grammar.insert_symbol(self.reference, fsa, initial, final, tag + (self.reference,))
 
 	def __mul__(self, closure):
-		return _Closure(self, closure)
+		"""
+		Apply a closure to the reference.
+
+		The closure is either one of the closure constants or a pair of integers C{(m, n)}, for a reference repeated from C{m} to C{n} times;
+		C{n} can be C{None} for no maximum.
+		Booleans are never taken for integers, so that C{(True, False)} is the optional closure and C{(1, 0)} is an invalid count.
+
+		@param closure: The closure to apply.
+		@type closure: Closure constant, or tuple of int
+		@rtype: NormalExpression
+		@raise TypeError: If a bound is not an integer.
+		@raise ValueError: If the count is negative or empty.
+		"""
+		minimum, maximum = closure
+		if isinstance(minimum, bool) and isinstance(maximum, bool):
+			return _Closure(self, closure)
+		else:
+			return _Repetition(self, minimum, maximum)
+
+
+class _Interned(type):
+	"""
+	The metaclass of literals, which interns their instances.
+
+	Creating a literal equal to a living one, i.e. of the same class and with an equal content of the same type, returns the living instance,
+	so that equal literals are usually the same object; contents of different types, such as C{1} and C{True}, are never merged.
+	The content is computed from the constructor arguments by the L{_key<Literal._key>} class method, so that no instance is built for a living one;
+	classes overriding the constructor but not C{_key} are built first and then interned.
+	Instances are kept in a weak-value table, so that literals no longer used are released.
+	Literals with an unhashable content are not interned.
+	@note: For internal use only.
+	"""
+	__instances = weakref.WeakValueDictionary()
+
+	def __init__(cls, name, bases, members):
+		type.__init__(cls, name, bases, members)
+		for c in cls.__mro__:
+			if "__init__" in c.__dict__:
+				cls.__keyed = "_key" in c.__dict__
+				break
+
+	def __call__(cls, *args, **kwargs):
+		if cls.__keyed:
+			try:
+				content = cls._key(*args, **kwargs)
+				instance = _Interned.__instances.get((cls, type(content), content))
+			except TypeError: #invalid arguments or unhashable content
+				instance = None
+			if instance is not None:
+				return instance
+		return cls._intern(type.__call__(cls, *args, **kwargs))
+
+	def _intern(cls, instance):
+		"""
+		Return the living instance equal to a literal, registering the literal if there is none.
+		"""
+		try:
+			return _Interned.__instances.setdefault((cls, type(instance._content), instance._content), instance)
+		except TypeError: #unhashable content
+			return instance
+
+
+def _restore_literal(cls, state):
+	"""
+	Rebuild and intern a pickled literal.
+	@note: For internal use only.
+	"""
+	instance = cls.__new__(cls)
+	instance.__setstate__(state)
+	return cls._intern(instance)
 
 
 class Literal(NormalExpression):
@@ -348,8 +424,12 @@ class Literal(NormalExpression):
 
 	During token parsing, the methods L{match} and L{process} are called.
 
+	Literals are interned: equal literals are usually the same object, and their hash code is computed once.
+
 	@see: Reference
 	"""
+	__metaclass__ = _Interned
+
 	def __init__(self, content):
 		"""
 		Create a terminal symbol.
@@ -357,6 +437,29 @@ class Literal(NormalExpression):
 		@type content: object
 		"""
 		self._content = content
+		self.__rehash()
+
+	def _key(cls, content):
+		"""
+		Return the content of the literal that the constructor would build from the same arguments, with no instance created.
+		It must be overridden along with the constructor.
+
+		@rtype: object
+		"""
+		return content
+	_key = classmethod(_key)
+
+	def __getstate__(self):
+		state = self.__dict__.copy()
+		del state["_Literal__hash"]
+		return state
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self.__rehash()
+
+	def __reduce__(self):
+		return (_restore_literal, (self.__class__, self.__getstate__()))
 
 	def __eq__(self, other):
 		"""
@@ -367,14 +470,33 @@ class Literal(NormalExpression):
 		@rtype: bool
 		@return: True if the two contents are equal.
 		"""
-		if isinstance(other, Literal):
+		if self is other:
+			return True
+		elif isinstance(other, Literal):
 			return self._content == other._content
 		elif other is None:
 			return False
 		else:
 			return NotImplemented
 
+	def __rehash(self):
+		try:
+			self.__hash = self._compute_hash()
+		except TypeError: #unhashable content
+			self.__hash = None
+
 	def __hash__(self):
+		if self.__hash is None:
+			return self._compute_hash()
+		return self.__hash
+
+	def _compute_hash(self):
+		"""
+		Compute the hash code of the literal, which is cached.
+		It is overridden for contents that are expensive to hash.
+
+		@rtype: int
+		"""
 		return hash(self.__class__) ^ hash(self._content)
 
 	def __repr__(self):
@@ -408,66 +530,186 @@ class Literal(NormalExpression):
 		"""
 		return token
 
+	def dispatch_key(self):
+		"""
+		Return a key that must be among the dispatch keys of any token matching the literal.
+		It is used by parsers to skip the literals that can not match a token without calling L{match}.
+		It is often overridden for specialized behavior.
+
+		@rtype: hashable
+		@return: C{None}, since the literal can not be dispatched by key.
+		"""
+		return None
+
 	def insert_transitions(self, grammar, fsa, initial, final, tag):
 		fsa.add_transition(initial, self, final, tag)
 
 
+def _items(expression):
+	"""
+	Return the items an expression contributes to a concatenation:
+	the items of its only concatenation, or the whole expression if it is an alternative.
+	@note: For internal use only.
+	"""
+	expression = expression.to_expression()
+	alternatives = list(expression)
+	if len(alternatives) == 1:
+		return alternatives[0]
+	else:
+		return (expression,)
+
+def _item_repr(expression):
+	"""
+	Return the string representation of an item of a sequence, enclosing alternatives in brackets.
+	@note: For internal use only.
+	"""
+	if len(list(expression.to_expression())) > 1:
+		return "(%r)" % expression
+	else:
+		return repr(expression)
+
+def _symbols_hash(symbols):
+	"""
+	Return the hash code of a compound expression from its symbols.
+	An expression with a single symbol hashes like the symbol, and one with no symbols like S{epsilon},
+	since it can be equal to them.
+	@note: For internal use only.
+	"""
+	if len(symbols) == 1:
+		for s in symbols:
+			return hash(s)
+	elif not symbols:
+		return hash(EPSILON_SYMBOL)
+	return hash(_ParallelExpression) ^ hash(symbols)
+
 class _ParallelExpression(NormalExpression):
 	"""
-	A L{NormalExpression} implemented as parallel, i.e. concatenation of alternatives.
+	A L{NormalExpression} implemented as parallel, i.e. alternative of concatenations.
+
+	The items of the concatenations are symbols or nested parallel expressions, which are shared and never distributed:
+	M{(A|B) + (C|D)} is kept as a single concatenation of two alternatives, rather than as M{AC | AD | BC | BD}.
+	The distributed form is only computed to compare expressions that differ in their factored form but have the same symbols;
+	hash codes only depend on the symbols, and those of an expression with a single symbol are the same as the symbol's.
 	@note: For internal use only.
 	"""
 	def __init__(self, double_iterable):
 		"""
 		Create an instance of ParallelExpression based on an alternative of concatenations.
 		M{(A1+A2+...)|(B1+B2+...)|...}
+		Repeated concatenations are dropped; nested parallel expressions and free order sequences are told apart by identity.
 		@note: For internal use only.
-		@param double_iterable: A matrix of literals.
+		@param double_iterable: A matrix of symbols or parallel expressions.
 
 		"""
-		self.__fsot = frozenset([tuple(conc) for conc in double_iterable])
+		alternatives = []
+		keys = set()
+		for conc in double_iterable:
+			conc = tuple(conc)
+			key = tuple([_ParallelExpression.__key(s) for s in conc])
+			if key not in keys:
+				keys.add(key)
+				alternatives.append(conc)
+		self.__alternatives = tuple(alternatives)
+		self.__normal_form = None
+		self.__symbols = None
+
+	def __key(s):
+		if isinstance(s, (_ParallelExpression, FreeOrder)):
+			return (s.__class__, id(s))
+		else:
+			return s
+	__key = staticmethod(__key)
+
+	def __getstate__(self):
+		return {"_ParallelExpression__alternatives": self.__alternatives}
+
+	def __setstate__(self, state):
+		if "_ParallelExpression__fsot" in state: #pickled by earlier versions
+			self.__alternatives = tuple(state["_ParallelExpression__fsot"])
+		else:
+			self.__alternatives = state["_ParallelExpression__alternatives"]
+		self.__normal_form = None
+		self.__symbols = None
 
 	def __iter__(self):
-		return self.__fsot.__iter__()
+		return self.__alternatives.__iter__()
 
 	def to_expression(self):
 		return self
 
+	def _symbols(self):
+		"""
+		Return the symbols of the expression at any depth, S{epsilon} excluded, which are the same for equal expressions.
+		"""
+		if self.__symbols is None:
+			symbols = set()
+			for conc in self.__alternatives:
+				for s in conc:
+					if isinstance(s, (_ParallelExpression, FreeOrder)):
+						symbols |= s._symbols()
+					elif not isinstance(s, _Epsilon):
+						symbols.add(s)
+			self.__symbols = frozenset(symbols)
+		return self.__symbols
+
+	def _normal_form(self):
+		"""
+		Return the distributed form of the expression, as a set of concatenations of symbols.
+		"""
+		if self.__normal_form is None:
+			normal_form = set()
+			for conc in self.__alternatives:
+				partial = [()]
+				for s in conc:
+					if isinstance(s, (_ParallelExpression, FreeOrder)):
+						partial = [x + y for x in partial for y in s._normal_form()]
+					else:
+						partial = [x + (s,) for x in partial]
+				normal_form.update(partial)
+			self.__normal_form = frozenset(normal_form)
+		return self.__normal_form
+
 	def __repr__(self):
 		r = []
-		for t in self.__fsot:
-			r.append(" ".join([`s` for s in t]))
+		for t in self.__alternatives:
+			r.append(" ".join([_item_repr(s) for s in t]))
 		return " | ".join(r)
 
 	def __add__(self, b):
 		if not b: #epsilon or none
-			return _ParallelExpression(self.__fsot)
+			return self
 		else:
-			return _ParallelExpression([x + y for x in self.__fsot for y in b.to_expression()])
+			return _ParallelExpression([_items(self) + _items(b)])
 
 	def __or__(self, b):
-		return _ParallelExpression(self.__fsot | b.to_expression().__fsot)
+		return _ParallelExpression(self.__alternatives + b.to_expression().__alternatives)
 
 	def __eq__(self, other):
 		if isinstance(other, _ParallelExpression):
-			return self.__fsot == other.__fsot
+			if self is other or frozenset(self.__alternatives) == frozenset(other.__alternatives):
+				return True
+			elif self._symbols() != other._symbols():
+				return False
+			return self._normal_form() == other._normal_form()
+		elif isinstance(other, NormalExpression):
+			return self == other.to_expression()
 		elif other is None:
 			return False
 		else:
 			return NotImplemented
 
 	def __hash__(self):
-		return hash(self.__class__) ^ hash(self.__fsot)
+		return _symbols_hash(self._symbols())
 
 	def __nonzero__(self):
-		for c in self.__fsot:
+		for c in self.__alternatives:
 			for t in c:
 				if not t: return False
 		return True
 
 	def dependencies(self):
 		dep = set()
-		for c in self.__fsot:
+		for c in self.__alternatives:
 			for s in c:
 				dep |= s.dependencies()
 		return frozenset(dep)
@@ -484,9 +726,141 @@ class _ParallelExpression(NormalExpression):
 				prev = next
 
 		tag = Utilities.nvl(tag, ())
-		for concatenation in self.__fsot:
+		for concatenation in self.__alternatives:
 			concatenation_build(concatenation, grammar, fsa, initial, final, tag)
 
+class FreeOrder(NormalExpression):
+	"""
+	A sequence of expressions in any order.
+
+	For example, the code to represent a clause where subject, verb and object can be permuted is:
+
+		>>> g["clause"] = FreeOrder(Reference("subject"), Reference("verb"), Reference("object"))
+
+	It is equivalent to the alternative of all the permutations of the expressions, M{SVO | SOV | VSO | VOS | OSV | OVS},
+	but the permutations are never enumerated to compile or hash it:
+	the sub-FSA has a state for each subset of expressions already matched, i.e. M{2^n} states rather than M{n!} paths.
+	Free order sequences of the same expressions are equal in any order;
+	the permutations are only enumerated to compare with an expression of another kind having the same symbols.
+	"""
+	def __init__(self, *expressions):
+		"""
+		Create a free order sequence.
+
+		@param expressions: The expressions to permute.
+		@type expressions: NormalExpression
+		"""
+		for e in expressions:
+			if not isinstance(e, NormalExpression):
+				raise TypeError(e)
+		self.__expressions = expressions
+		self.__symbols = None
+
+	def __getstate__(self):
+		return {"_FreeOrder__expressions": self.__expressions}
+
+	def __setstate__(self, state):
+		self.__dict__.update(state)
+		self.__symbols = None
+
+	def __iter__(self):
+		return self.__expressions.__iter__()
+
+	def _symbols(self):
+		"""
+		Return the symbols of the expressions at any depth, S{epsilon} excluded, as L{_ParallelExpression._symbols} does.
+		"""
+		if self.__symbols is None:
+			symbols = set()
+			for e in self.__expressions:
+				symbols |= e.to_expression()._symbols()
+			self.__symbols = frozenset(symbols)
+		return self.__symbols
+
+	def __counts(self):
+		"""
+		Return how many times each expression occurs, regardless of their order.
+		"""
+		counts = {}
+		for e in self.__expressions:
+			counts[e] = counts.get(e, 0) + 1
+		return counts
+
+	def _normal_form(self):
+		"""
+		Return the distributed form of the expression, as a set of concatenations of symbols.
+		All the permutations are enumerated, so it is only used to compare expressions.
+		"""
+		def permutations(expressions):
+			if not expressions:
+				return [()]
+			p = []
+			for i, e in enumerate(expressions):
+				for m in permutations(expressions[:i] + expressions[i + 1:]):
+					p.append((e,) + m)
+			return p
+
+		normal_form = set()
+		for permutation in permutations(self.__expressions):
+			concatenation = EPSILON_SYMBOL
+			for e in permutation:
+				concatenation = concatenation + e
+			normal_form |= concatenation.to_expression()._normal_form()
+		return frozenset(normal_form)
+
+	def __eq__(self, other):
+		if isinstance(other, FreeOrder):
+			if self is other or self.__expressions == other.__expressions or self.__counts() == other.__counts():
+				return True
+			elif self._symbols() != other._symbols():
+				return False
+			return self._normal_form() == other._normal_form()
+		elif isinstance(other, NormalExpression):
+			other = other.to_expression()
+			if self._symbols() != other._symbols():
+				return False
+			return self._normal_form() == other._normal_form()
+		elif other is None:
+			return False
+		else:
+			return NotImplemented
+
+	def __hash__(self):
+		return _symbols_hash(self._symbols())
+
+	def __repr__(self):
+		return "(%s)" % " & ".join([_item_repr(e) for e in self.__expressions])
+
+	def __nonzero__(self):
+		for e in self.__expressions:
+			if e: return True
+		return False
+
+	def dependencies(self):
+		dep = set()
+		for e in self.__expressions:
+			dep |= e.dependencies()
+		return frozenset(dep)
+
+	def insert_transitions(self, grammar, fsa, initial, final, tag):
+		# the state for each subset of expressions is labelled with the bitset of the expressions already matched:
+		# initial is the empty subset, final the whole set
+		tag = Utilities.nvl(tag, ())
+		n = len(self.__expressions)
+		if n == 0:
+			fsa.add_transition(initial, EPSILON_SYMBOL, final, tag)
+			return
+		full = (1 << n) - 1
+		states = {0: initial, full: final}
+		for matched in xrange(full):
+			for i, e in enumerate(self.__expressions):
+				bit = 1 << i
+				if not matched & bit:
+					if matched | bit not in states:
+						states[matched | bit] = fsa.add_state()
+					e.insert_transitions(grammar, fsa, states[matched], states[matched | bit], tag)
+
+
 class _Closure(Reference):
 	"""
 	Container for a quantified reference.
@@ -523,13 +897,17 @@ class _Closure(Reference):
 			Reference.insert_transitions(self, grammar, fsa, initial_node, final_node, tag)
 
 		def insert_back():
-			# initial -> b super;
-			# b -> initial epsilon;
+			# initial -> l epsilon;
+			# l -> b super;
+			# b -> l epsilon;
 			# b -> final epsilon
+			# the loop has its own initial state l, so that it does not lead to the alternatives departing from initial
 
+			loop = fsa.add_state()
 			back_end = fsa.add_state()
-			build_reference(grammar, fsa, initial, back_end, tag)
-			fsa.add_transition(back_end, EPSILON_SYMBOL, initial)
+			fsa.add_transition(initial, EPSILON_SYMBOL, loop)
+			build_reference(grammar, fsa, loop, back_end, tag)
+			fsa.add_transition(back_end, EPSILON_SYMBOL, loop)
 			fsa.add_transition(back_end, EPSILON_SYMBOL, final)
 
 		if self.__forward:
@@ -539,11 +917,104 @@ class _Closure(Reference):
 		else:
 			build_reference(grammar, fsa, initial, final, tag)
 
+	def __eq__(self, other):
+		if isinstance(other, _Closure):
+			return self.reference == other.reference and (self.__forward, self.__back) == (other.__forward, other.__back)
+		elif isinstance(other, (_ParallelExpression, FreeOrder)):
+			return other == self
+		elif isinstance(other, NormalExpression) or other is None:
+			return False
+		else:
+			return NotImplemented
+
+	def __hash__(self):
+		return Reference.__hash__(self) ^ hash((self.__forward, self.__back))
+
 	def __repr__(self):
 		index = (self.__back & 1) << 1 | (self.__forward & 1)
 		CHARS = "!?+*"
 		return Reference.__repr__(self) + CHARS[index]
 
+
+class _Repetition(Reference):
+	"""
+	Container for a reference repeated a bounded number of times, M{<X>{m,n}}.
+
+	Counted closures can be accessed by the C{*} operator;
+	for example, the code to represent M{Z ::= X{2,4}} is:
+
+		>>> g["Z"] = Reference("X") * (2, 4)
+	"""
+	def __init__(self, expression, minimum, maximum):
+		"""
+		Create a counted closure.
+
+		The repetitions are depicted as a chain of copies of the reference, where every copy after the C{m}-th can be skipped
+		by an S{epsilon} transition to the end of the chain:
+		the chain has C{n} copies, whose sub-automaton is shared as for any other symbol referenced more than once.
+		With no maximum, the chain ends with a loop.
+
+		@param expression: The expression to apply the closure to.
+		@type expression: Reference
+		@param minimum: The minimum count of repetitions.
+		@type minimum: int
+		@param maximum: The maximum count of repetitions, or C{None}.
+		@type maximum: int
+		@raise TypeError: If a bound is not an integer.
+		@raise ValueError: If the count is negative or empty.
+		"""
+		for bound in (minimum, maximum):
+			if bound is not None and (isinstance(bound, bool) or not isinstance(bound, (int, long))):
+				raise TypeError(bound)
+		if minimum < 0 or maximum is not None and maximum < max(minimum, 1):
+			raise ValueError((minimum, maximum))
+		Reference.__init__(self, expression.reference)
+		self.__minimum, self.__maximum = minimum, maximum
+
+	def __eq__(self, other):
+		if isinstance(other, _Repetition):
+			return self.reference == other.reference and (self.__minimum, self.__maximum) == (other.__minimum, other.__maximum)
+		elif isinstance(other, (_ParallelExpression, FreeOrder)):
+			return other == self
+		elif isinstance(other, NormalExpression) or other is None:
+			return False
+		else:
+			return NotImplemented
+
+	def __hash__(self):
+		return Reference.__hash__(self) ^ hash((self.__minimum, self.__maximum))
+
+	def insert_transitions(self, grammar, fsa, initial, final, tag):
+		def build_reference(initial_node, final_node):
+			Reference.insert_transitions(self, grammar, fsa, initial_node, final_node, tag)
+
+		prev = initial
+		if self.__maximum is None:
+			for i in xrange(self.__minimum - 1):
+				next = fsa.add_state()
+				build_reference(prev, next)
+				prev = next
+			if self.__minimum:
+				_Closure(self, POSITIVE_CLOSURE).insert_transitions(grammar, fsa, prev, final, tag)
+			else:
+				_Closure(self, KLEENE_CLOSURE).insert_transitions(grammar, fsa, prev, final, tag)
+		else:
+			for i in xrange(self.__maximum):
+				if i >= self.__minimum:
+					fsa.add_transition(prev, EPSILON_SYMBOL, final)
+				if i + 1 == self.__maximum:
+					next = final
+				else:
+					next = fsa.add_state()
+				build_reference(prev, next)
+				prev = next
+
+	def __repr__(self):
+		if self.__maximum is None:
+			return "%s{%d,}" % (Reference.__repr__(self), self.__minimum)
+		else:
+			return "%s{%d,%d}" % (Reference.__repr__(self), self.__minimum, self.__maximum)
+
 #{ Closure constants
 
 OPTIONAL_CLOSURE = (True, False)
@@ -590,6 +1061,10 @@ class _Epsilon(Literal):
 	def __init__(self):
 		Literal.__init__(self, None)
 
+	def _key(cls):
+		return None
+	_key = classmethod(_key)
+
 	def __add__(self, b):
 		"""
 		Concatenate with another expression.
@@ -604,7 +1079,7 @@ class _Epsilon(Literal):
 		if not b:
 			return EPSILON_SYMBOL
 		else:
-			return _pack(b._to_concatenations())
+			return b.to_expression()
 
 	def __eq__(self, other):
 		"""
@@ -613,10 +1088,12 @@ class _Epsilon(Literal):
 		@param other: The expression to compare.
 		@type other: NormalExpression
 		@rtype: bool
-		@return: True if the parameter is S{epsilon} or C{None}, False if it is a different normal expression.
+		@return: True if the parameter is S{epsilon}, C{None} or an expression equal to S{epsilon}, False if it is a different normal expression.
 		"""
 		if other is None or isinstance(other, _Epsilon):
 			return True
+		elif isinstance(other, (_ParallelExpression, FreeOrder)):
+			return other == self
 		elif isinstance(other, NormalExpression):
 			return False
 		else:
@@ -72,7 +72,7 @@ class ExpressionReader(object):
 
 		@param tokenizer: The tokenizer (or scanner) to use.
 		@type tokenizer: tokenizer.Tokenizer
-		@param parser: The parser to use.
+		@param parser: The parser to use, or a parser with the same C{parse_lattice} method, as returned by recursive L{compilings<grammar.Grammar.compile>}.
 		@type parser: fsa.Parser
 		"""
 		self.__parser = parser
@@ -82,7 +82,8 @@ class ExpressionReader(object):
 		"""
 		Transform a stream into a list of syntax trees.
 
-		The tokenizer forms streams into token sequences, then the parser forms them into syntax trees.
+		The tokenizer forms streams into a L{lattice<tokenizer.Tokenizer.lattice>} of token sequences,
+		then the parser forms all of them into syntax trees at once, parsing each ambiguous token once.
 
 		@param stream: The stream to read, usually a string.
 		@type stream: C{str}
@@ -90,20 +91,18 @@ class ExpressionReader(object):
 		@return: The list of possible interpretations.
 		@rtype: list of ParseTree
 		"""
-		token_tree = self.__tokenizer(stream)
-		results = []
-		errors = ExpressionParseError()
-		for expansion in token_tree.expand():
-			try:
-				rot = self.__parser(expansion)
-				for recognition in rot.expand():
-					pt = ParseTree()
-					pt.add_recognition(recognition)
-					results.append(pt)
-			except ParseError, pe:
-				errors.include(pe)
-		if len(results)==0 and len(errors)>0:
+		token_lattice = self.__tokenizer.lattice(stream)
+		try:
+			forest = self.__parser.parse_lattice(token_lattice)
+		except ParseError, pe:
+			errors = ExpressionParseError()
+			errors.include(pe)
 			raise errors
+		results = []
+		for recognition in forest.expand():
+			pt = ParseTree()
+			pt.add_recognition(recognition)
+			results.append(pt)
 		return results
 
 class ParseTree(object):
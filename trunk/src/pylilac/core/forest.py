@@ -0,0 +1,167 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+A module for the ParseForest utility class.
+
+@author: Paolo Olmino
+@license: U{GNU GPL GNU General Public License<http://www.gnu.org/licenses/gpl.html>}
+@version: Alpha 0.1.6
+"""
+
+__docformat__ = "epytext en"
+
+from optiontree import OptionTree
+
+
+class ParseForest(object):
+	"""
+	A shared, packed container for the alternative sequences found while parsing.
+
+	Each node stands for a point reached while parsing, typically a C{(position, state)} pair,
+	and holds the options departing from it: an element and the node that follows it.
+	Identical suffixes are stored once, since all the paths reaching the same node share its options.
+
+	The forest:
+		>>>	(0) -A-> (1) -B-> (2)
+		...	(0) -C-> (1)
+
+	Can be exploded into the sequences:
+		>>> [A, B]
+		>>> [C, B]
+
+	"""
+	def __init__(self, root):
+		"""
+		Create a forest departing from the given node.
+
+		@param root: The node where all the sequences begin.
+		@type root: hashable
+		"""
+		self.root = root
+		self.__options = {}
+
+	def add_node(self, node):
+		"""
+		Add a node, with no options.
+		A node with no options ends the sequences reaching it.
+
+		@param node: The node to add.
+		@type node: hashable
+		"""
+		self.__options.setdefault(node, [])
+
+	def add_option(self, node, element, successor):
+		"""
+		Add an option to a node: the element, followed by the options of the successor node.
+
+		@param node: The node the option departs from.
+		@type node: hashable
+		@param element: The sequence element.
+		@type element: object
+		@param successor: The node the option leads to.
+		@type successor: hashable
+		"""
+		self.__options.setdefault(node, []).append((element, successor))
+		self.__options.setdefault(successor, [])
+
+	def options(self, node):
+		"""
+		Return the options departing from a node.
+
+		@param node: A node of the forest.
+		@type node: hashable
+		@rtype: list of C{(element, successor)} tuples
+		"""
+		return self.__options[node]
+
+	def __contains__(self, node):
+		"""
+		Check if a node belongs to the forest.
+
+		@rtype: bool
+		"""
+		return node in self.__options
+
+	def __len__(self):
+		"""
+		Return the count of nodes.
+		@rtype: int
+		"""
+		return len(self.__options)
+
+	def __nonzero__(self):
+		return self.root in self.__options
+
+	def __postorder(self):
+		"""
+		Return the nodes reachable from the root, each after all of its successors.
+		"""
+		order = []
+		if self.root not in self.__options:
+			return order
+		visited = set([self.root])
+		work = [(self.root, iter(self.__options[self.root]))]
+		while work:
+			node, options = work[-1]
+			for element, successor in options:
+				if successor not in visited:
+					visited.add(successor)
+					work.append((successor, iter(self.__options[successor])))
+					break
+			else:
+				work.pop()
+				order.append(node)
+		return order
+
+	def nodes(self):
+		"""
+		Return the nodes reachable from the root, each before all of its successors.
+
+		@rtype: list
+		"""
+		order = self.__postorder()
+		order.reverse()
+		return order
+
+	def count(self):
+		"""
+		Return the count of the sequences in the forest, without exploding it.
+
+		@rtype: int
+		"""
+		counts = {}
+		for node in self.__postorder():
+			options = self.__options[node]
+			if options:
+				counts[node] = sum([counts[successor] for element, successor in options])
+			else:
+				counts[node] = 1
+		return counts.get(self.root, 0)
+
+	def to_option_tree(self):
+		"""
+		Convert the forest into an L{OptionTree<optiontree.OptionTree>}.
+		Option trees built for shared nodes share their successors, so the conversion is linear in the size of the forest.
+
+		@rtype: OptionTree
+		"""
+		successors = {}
+		for node in self.__postorder():
+			successors[node] = [OptionTree(element, successors[successor]) for element, successor in self.__options[node]]
+		return OptionTree(None, successors.get(self.root, []))
+
+	def expand(self):
+		"""
+		Explode the forest.
+		@return: A list of options; each option is a possible sequence of elements.
+		@rtype: list of list of object
+		"""
+		return self.to_option_tree().expand()
+
+	def __repr__(self):
+		"""
+		Return a short string representation of the forest.
+		@rtype: str
+		"""
+		return "%s{%d nodes, %d paths}" % (self.__class__.__name__, len(self), self.count())
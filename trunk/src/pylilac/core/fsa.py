@@ -5,6 +5,7 @@
 A module for grammar compiling and for parsing.
 Parsing is meant as traversing and tagging token sequences using a compiled grammar.
 The L{Finite State Automaton<FSA>} class is used to compile grammars and the L{Parser} class to parse token streams.
+Parsers run on L{frozen<CompactFSA>} automata, which are produced by L{FSA.freeze} and can be L{saved<CompactFSA.dump>} in a binary format, or on L{lazy<LazyDFA>} automata, which are determinized while parsing.
 @author: Paolo Olmino
 @license: U{GNU GPL GNU General Public License<http://www.gnu.org/licenses/gpl.html>}
 @version: Alpha 0.1.6
@@ -12,7 +13,15 @@ The L{Finite State Automaton<FSA>} class is used to compile grammars and the L{P
 
 __docformat__ = "epytext en"
 
+from array import array
+from collections import deque
+from itertools import izip
+import mmap
+import pickle
+import struct
+import sys
 from optiontree import OptionTree
+from forest import ParseForest
 
 
 class StateError(KeyError):
@@ -95,6 +104,8 @@ class FSA(object):
 		self.__final_states = set()
 		self.__states = set()
 		self.__transitions = {} #{start: [(label, end, tag)...]}
+		self.__incoming = {} #{end: set of starts}
+		self.__closures = {} #{state: frozenset of states}
 
 	def __len__(self):
 		"""
@@ -147,6 +158,7 @@ class FSA(object):
 				raise StateError(state)
 		self.__states.add(state)
 		self.__transitions[state] = []
+		self.__incoming[state] = set()
 		return state
 
 	def has_state(self, state):
@@ -165,9 +177,10 @@ class FSA(object):
 
 	def remove_state(self, state):
 		"""
-		Remove a state from M{S}.
+		Remove a state from M{S}, with its departing and arriving transitions.
 
 		If the state is initial, another state is set to initial.
+		The cost is proportional to the transitions of the state and of its predecessors.
 
 		@param state: An existing state.
 		@type state: hashable
@@ -175,19 +188,83 @@ class FSA(object):
 		"""
 		if state not in self.__states:
 			raise StateError(state)
-		self.__states.remove(state)
-		del self.__transitions[state]
-		for transitions in self.__transitions:
-			for transition in transitions:
-				if transition[1] == state: #State.__eq__
-					transitions.remove(transition)
-		if self.__initial_state == state:
+		self.remove_states([state])
+
+	def remove_states(self, states):
+		"""
+		Remove some states from M{S}, with their departing and arriving transitions.
+
+		If the initial state is removed, another state is set to initial.
+
+		@param states: Existing states.
+		@type states: iterable of hashable
+		@raise StateError: Fired if a state does not exist.
+		@return: The count of the removed states.
+		@rtype: int
+		"""
+		removed = set(states)
+		for state in removed:
+			if state not in self.__states:
+				raise StateError(state)
+		predecessors = set()
+		for state in removed:
+			predecessors |= self.__incoming[state]
+		for start in predecessors - removed:
+			self.__transitions[start] = [t for t in self.__transitions[start] if t[1] not in removed] #State.__eq__, State.__hash__
+		for state in removed:
+			for label, end, tag in self.__transitions[state]:
+				if end not in removed:
+					self.__incoming[end].discard(state)
+		for state in removed:
+			del self.__transitions[state]
+			del self.__incoming[state]
+		self.__states -= removed
+		self.__final_states -= removed
+		if removed:
+			self.__closures.clear()
+		if self.__initial_state in removed:
 			if self.__states:
-				self.__initial_state = self.__states[0]
+				self.__initial_state = iter(self.__states).next()
 			else:
 				self.__initial_state = None
-		if state in self.__final_states:
-			self.__final_states.remove(state)
+		return len(removed)
+
+	def prune_unreachable(self):
+		"""
+		Remove the states that can not be reached from the initial state.
+
+		@return: The count of the removed states.
+		@rtype: int
+		"""
+		reachable = set()
+		if self.__initial_state is not None:
+			reachable.add(self.__initial_state)
+		stack = list(reachable)
+		while stack:
+			for label, end, tag in self.__transitions[stack.pop()]:
+				if end not in reachable:
+					reachable.add(end)
+					stack.append(end)
+		return self.remove_states(self.__states - reachable)
+
+	def prune_dead(self):
+		"""
+		Remove the states from which no final state can be reached.
+		The initial state is always kept.
+
+		@return: The count of the removed states.
+		@rtype: int
+		"""
+		live = set(self.__final_states)
+		stack = list(live)
+		while stack:
+			for start in self.__incoming[stack.pop()]:
+				if start not in live:
+					live.add(start)
+					stack.append(start)
+		if self.__initial_state is not None:
+			live.add(self.__initial_state)
+		return self.remove_states(self.__states - live)
 
 	def get_initial(self):
 		"""
@@ -277,7 +354,11 @@ class FSA(object):
 		self.__states.add(end)
 		if not label:
 			tag = None
+		if label == EPSILON:
+			self.__closures.clear()
 		self.__transitions.setdefault(start, []).append((label, end, tag))
+		self.__incoming.setdefault(start, set())
+		self.__incoming.setdefault(end, set()).add(start)
 		if end not in self.__transitions:
 			self.__transitions[end] = []
 
@@ -298,15 +379,20 @@ class FSA(object):
 		"""
 		if start not in self.__states:
 			raise StateError(start)
-		found = 0
 		transitions = self.__transitions[start]
-		for transition in self.__transitions[start]:
-			if transition[0] == label and transition[1] == end: #State.__eq__, State.__hash__, Label.__eq__
-				transitions.remove(transition)
-				found += 1
+		kept = [t for t in transitions if not (t[0] == label and t[1] == end)] #State.__eq__, State.__hash__, Label.__eq__
+		found = len(transitions) - len(kept)
 		if found == 0:
 			raise TransitionError(start, label, end)
 		else:
+			self.__transitions[start] = kept
+			for t in kept:
+				if t[1] == end:
+					break
+			else:
+				self.__incoming[end].discard(start)
+			if label == EPSILON:
+				self.__closures.clear()
 			return found
 
 
@@ -360,30 +446,107 @@ class FSA(object):
 		"""
 		Evaluate I{S{epsilon}-closure}(C{states}).
 
-		@param states: A subset of the FSA states.
+		The closure of each state is computed once and kept until an S{epsilon}-transition is added or removed.
+
+		@param states: A subset of the FSA states, or a single state.
 		@type states: set of hashable
+		@raise StateError: Fired if a state does not exist.
 		@return: The I{S{epsilon}-closure} of the given set of states.
 		@rtype: frozenset
 		"""
-		if isinstance(states, list):
-			v_s = states
-		elif isinstance(states, set):
-			v_s = [s for s in states]
-		else:
-			v_s = [states]
-		index = 0
-		while index < len(v_s):
-			state, index = v_s[index], index + 1
-			if not state in self.__states: #State.__eq__
-				raise StateError(state)
-			for label, end, t in self.__transitions[state]:
-				if label == EPSILON and end not in v_s: #State.__eq__, State.__hash__, Label.__eq__
-					v_s.append(end)
-		return frozenset(v_s)#State.__hash__, State.__eq__
+		if not isinstance(states, (list, set, frozenset, tuple)):
+			states = [states]
+		closure = set()
+		for state in states:
+			if state not in closure:
+				c = self.__closures.get(state)
+				if c is None:
+					if not state in self.__states: #State.__eq__
+						raise StateError(state)
+					self.__compute_closures([state])
+					c = self.__closures[state]
+				closure |= c
+		return frozenset(closure)#State.__hash__, State.__eq__
+
+	def epsilon_closures(self):
+		"""
+		Evaluate the I{S{epsilon}-closure} of every state.
+
+		@return: A dictionary associating each state to its I{S{epsilon}-closure}.
+		@rtype: dict (hashable -> frozenset)
+		"""
+		self.__compute_closures([s for s in self.__states if s not in self.__closures])
+		return dict(self.__closures)
+
+	def __compute_closures(self, states):
+		"""
+		Fill the closure cache for the given states and for all the states they reach by S{epsilon}-transitions.
+
+		The strongly connected components of the S{epsilon}-graph are found by Tarjan's algorithm;
+		they are completed in reverse topological order, so that each closure is the union of its component and of the closures already computed.
+		"""
+		def epsilon_ends(state):
+			return [end for label, end, t in self.__transitions[state] if label == EPSILON]
+
+		closures = self.__closures
+		number = {}
+		low = {}
+		stack = []
+		on_stack = set()
+		for root in states:
+			if root in closures or root in number:
+				continue
+			number[root] = low[root] = len(number)
+			stack.append(root)
+			on_stack.add(root)
+			work = [(root, iter(epsilon_ends(root)))]
+			while work:
+				v, ends = work[-1]
+				for w in ends:
+					if w in closures:
+						continue
+					if w not in number:
+						number[w] = low[w] = len(number)
+						stack.append(w)
+						on_stack.add(w)
+						work.append((w, iter(epsilon_ends(w))))
+						break
+					elif w in on_stack:
+						low[v] = min(low[v], number[w])
+				else:
+					work.pop()
+					if work:
+						u = work[-1][0]
+						low[u] = min(low[u], low[v])
+					if low[v] == number[v]:
+						component = set()
+						while True:
+							w = stack.pop()
+							on_stack.remove(w)
+							component.add(w)
+							if w == v:
+								break
+						c = set(component)
+						for w in component:
+							for end in epsilon_ends(w):
+								if end not in component:
+									c |= closures[end]
+						c = frozenset(c)
+						for w in component:
+							closures[w] = c
 
 	def __instance(self):
 		return self.__class__()
 
+	def __index_incoming(self):
+		"""
+		Rebuild the index of the arriving transitions from scratch.
+		"""
+		self.__incoming = dict([(state, set()) for state in self.__transitions])
+		for start, transitions in self.__transitions.items():
+			for label, end, tag in transitions:
+				self.__incoming[end].add(start)
+
 	def is_reduced(self):
 		"""
 		Evaluate if the FSA is I{reduced}.
@@ -433,47 +596,73 @@ class FSA(object):
 		"""
 		Return an FSA I{equivalent} to the current, having no S{epsilon} or reduplicated transitions.
 
+		The subset construction works on an index of the FSA, built once:
+		states are numbered, the transitions of each state are bucketed by C{(label, tag)},
+		the S{epsilon}-closures are taken from the L{cache<epsilon_closures>} and subsets are represented by sorted tuples of numbers.
+
 		@return: The reduced equivalent FSA.
 		@rtype: FSA
 		"""
-		def move(starts, label, tag):
-			mv = []
-			for start in starts:
-				for l, end, t in self.__transitions[start]:
-					if l == label and t == tag:
-						mv.append(end)
-			return mv
-		def tr_from(starts):
-			d = set()
-			for start in starts:
-				for label, e, tag in self.__transitions[start]:
-					if label != EPSILON:
-						d.add((label, tag))
-			return d
-
 		dfa = self.__instance()
 		dfa.add_state(0)
 		dfa.set_initial(0)
-
-		e0 = self.epsilon_closure(self.__initial_state)
+		if self.__initial_state is None:
+			return dfa
+
+		states = list(self.__states)
+		numbers = dict([(s, i) for i, s in enumerate(states)])
+		buckets = [] #buckets[n] = [((label, tag), [end...])...]
+		for state in states:
+			bucket, index = [], {}
+			for label, end, tag in self.__transitions[state]:
+				if label != EPSILON:
+					i = index.get((label, tag))
+					if i is None:
+						i = index[(label, tag)] = len(bucket)
+						bucket.append(((label, tag), []))
+					bucket[i][1].append(numbers[end])
+			buckets.append(bucket)
+		epsilon_closures = self.epsilon_closures()
+		final = set([numbers[f] for f in self.__final_states])
+
+		closures = {}
+		def state_closure(n):
+			c = closures.get(n)
+			if c is None:
+				c = closures[n] = frozenset([numbers[e] for e in epsilon_closures[states[n]]])
+			return c
+		def closure(ns):
+			c = set()
+			for n in ns:
+				if n not in c:
+					c |= state_closure(n)
+			return tuple(sorted(c))
+
+		e0 = closure([numbers[self.__initial_state]])
 		groupings = {e0: 0}
-		nfa_states = [(0, e0)]
+		nfa_states = [e0]
 		index = 0
-
 		while index < len(nfa_states):
-			dfa_state, nfas = nfa_states[index]
-			for exit, tag in tr_from(nfas):
-				k = self.epsilon_closure(move(nfas, exit, tag))
-				existing_new_node = groupings.get(k)
-				if not existing_new_node is None:
-					node = existing_new_node
-				else:
-					groupings[k] = node = len(dfa.states())
-					nfa_states.append((node, k))
-				dfa.add_transition(dfa_state, exit, node, tag)
+			nfas = nfa_states[index]
+			symbols, moves = [], {}
+			for n in nfas:
+				for symbol, ends in buckets[n]:
+					mv = moves.get(symbol)
+					if mv is None:
+						symbols.append(symbol)
+						moves[symbol] = list(ends)
+					else:
+						mv.extend(ends)
+			for symbol in symbols:
+				k = closure(moves[symbol])
+				node = groupings.get(k)
+				if node is None:
+					groupings[k] = node = len(nfa_states)
+					nfa_states.append(k)
+				dfa.add_transition(index, symbol[0], node, symbol[1])
 			index += 1
 		for grouping, state in groupings.items():
-			if grouping & self.__final_states:
+			if final.intersection(grouping):
 				dfa.set_final(state)
 		return dfa
 
@@ -482,7 +671,114 @@ class FSA(object):
 		"""
 		Return an FSA I{equivalent} to the current, having no reduplicated states.
 
+		Two states are reduplicated when they accept the same paths.
+		Reduced FSA's are minimized by Hopcroft's partition refinement, in M{O(|S{delta}| log |S|)}:
+		states are first split between final and non-final, then blocks are split until no block
+		has members whose transitions with the same label and tag lead into different blocks.
+		Unreachable states and states that can not reach a final state are dropped.
+		As a consequence, a L{parser<Parser>} running on the result reports a L{ParseError} at the first token leaving the states that can reach a final state,
+		which can be earlier than on the FSA before minimization, or on the result of L{minimized_by_signatures}, where such states are kept.
+
+		FSA's that are not reduced are minimized by L{minimized_by_signatures}.
+
+		@return: The minimized equivalent FSA.
+		@rtype: FSA
+		"""
+		if not self.is_reduced():
+			return self.minimized_by_signatures()
+
+		mfa = self.__instance()
+		if self.__initial_state is None:
+			return mfa
+
+		#reachable states, in breadth-first order
+		reachable = [self.__initial_state]
+		seen = set(reachable)
+		index = 0
+		while index < len(reachable):
+			for label, end, tag in self.__transitions[reachable[index]]:
+				if end not in seen:
+					seen.add(end)
+					reachable.append(end)
+			index += 1
+
+		#states that can reach a final state
+		live = set([f for f in self.__final_states if f in seen])
+		stack = list(live)
+		while stack:
+			for start in self.__incoming[stack.pop()]:
+				if start not in live and start in seen:
+					live.add(start)
+					stack.append(start)
+
+		mfa.add_state(self.__initial_state)
+		mfa.set_initial(self.__initial_state)
+		if self.__initial_state not in live:
+			return mfa
+
+		states = [s for s in reachable if s in live]
+		numbers = dict([(s, i) for i, s in enumerate(states)])
+		symbols = {}
+		inverse = [[] for s in states] #inverse[end] = [(symbol, start)...]
+		for start in states:
+			for label, end, tag in self.__transitions[start]:
+				if end in live:
+					symbol = symbols.setdefault((label, tag), len(symbols))
+					inverse[numbers[end]].append((symbol, numbers[start]))
+
+		blocks = []
+		block_of = [None] * len(states)
+		for members in (set([numbers[s] for s in states if s in self.__final_states]), set([numbers[s] for s in states if s not in self.__final_states])):
+			if members:
+				for s in members:
+					block_of[s] = len(blocks)
+				blocks.append(members)
+		waiting = set(range(len(blocks)))
+
+		while waiting:
+			splitter = list(blocks[waiting.pop()])
+			preimages = {}
+			for end in splitter:
+				for symbol, start in inverse[end]:
+					preimages.setdefault(symbol, set()).add(start)
+			for preimage in preimages.values():
+				touched = {}
+				for start in preimage:
+					touched.setdefault(block_of[start], []).append(start)
+				for b, members in touched.items():
+					block = blocks[b]
+					if len(members) == len(block):
+						continue
+					new_block = set(members)
+					block -= new_block
+					nb = len(blocks)
+					blocks.append(new_block)
+					for s in new_block:
+						block_of[s] = nb
+					if b in waiting or len(new_block) <= len(block):
+						waiting.add(nb)
+					else:
+						waiting.add(b)
+
+		leaders = [states[min(block)] for block in blocks]
+		initial_leader = leaders[block_of[0]]
+		mfa.__states = set(leaders)
+		mfa.__initial_state = initial_leader
+		mfa.__final_states = set([leader for leader in leaders if leader in self.__final_states])
+		mfa.__transitions = {}
+		for leader in leaders:
+			mfa.__transitions[leader] = [(label, leaders[block_of[numbers[end]]], tag) for label, end, tag in self.__transitions[leader] if end in live]
+		mfa.__index_incoming()
+		return mfa
+
+	def minimized_by_signatures(self):
+		"""
+		Return an FSA I{equivalent} to the current, having no reduplicated states.
+
 		Two states are reduplicated when all departing transitions are identical.
+		States having identical signatures are merged repeatedly, until no more states can be merged.
+
+		It is the reference implementation of L{minimized}, and it also supports FSA's that are not reduced.
 
 		@return: The minimized equivalent FSA.
 		@rtype: FSA
@@ -535,6 +831,7 @@ class FSA(object):
 				mfa.__final_states = last_final_states
 				mfa.__states = last_states
 				mfa.__transitions = last_transitions
+				mfa.__index_incoming()
 				return mfa
 			else:
 				current_initial_state = last_initial_state
@@ -556,10 +853,719 @@ class FSA(object):
 		cp.__states = self.__states.copy()
 		for state, transitions in self.__transitions.items():
 			cp.__transitions[state] = transitions[:]
+		for state, starts in self.__incoming.items():
+			cp.__incoming[state] = starts.copy()
+		cp.__closures = self.__closures.copy()
 		return cp
+
+	def splice(self, other, initial, final, retag = None):
+		"""
+		Insert a copy of another FSA between two states.
+
+		The states of the other FSA are copied as new integer states;
+		an S{epsilon}-transition leads from C{initial} to the copy of its initial state,
+		and S{epsilon}-transitions lead from the copies of its final states to C{final}.
+
+		@param other: The FSA to copy.
+		@type other: FSA or CompactFSA
+		@param initial: The state from which the copy departs.
+		@type initial: hashable
+		@param final: The state in which the copy ends.
+		@type final: hashable
+		@param retag: A function converting the tags of the copied transitions, except S{epsilon}-transitions; if C{None}, tags are copied as they are.
+		@type retag: callable
+		@raise StateError: Fired if C{initial} or C{final} do not exist.
+		@raise TypeError: Fired if the states of the FSA are not integers.
+		@return: A dictionary associating the states of the other FSA to their copies.
+		@rtype: dict
+		"""
+		if initial not in self.__states:
+			raise StateError(initial)
+		if final not in self.__states:
+			raise StateError(final)
+		if other.get_initial() is None:
+			return {}
+		base = self._get_next_available_state()
+		copies = {}
+		for state in other.states():
+			copies[state] = self.add_state(base + len(copies))
+		for state in other.states():
+			start = copies[state]
+			for label, end, tag in other.transitions_from(state):
+				if retag is not None and label != EPSILON:
+					tag = retag(tag)
+				self.add_transition(start, label, copies[end], tag)
+		self.add_transition(initial, EPSILON, copies[other.get_initial()])
+		for state in other.get_final():
+			self.add_transition(copies[state], EPSILON, final)
+		return copies
+
+	def freeze(self):
+		"""
+		Create an immutable, integer-indexed copy of the FSA, suitable for parsing.
+
+		The states are renumbered in breadth-first order starting from the initial state,
+		labels and tags are interned in tables and the transitions are stored in compact arrays.
+
+		@return: The frozen equivalent FSA.
+		@rtype: L{CompactFSA}
+		"""
+		numbers = {}
+		order = []
+		def number(state):
+			if state not in numbers:
+				numbers[state] = len(order)
+				order.append(state)
+		if self.__initial_state is not None:
+			number(self.__initial_state)
+		index = 0
+		while index < len(order):
+			for label, end, tag in self.__transitions[order[index]]:
+				number(end)
+			index += 1
+		for state in self.__states:
+			number(state)
+
+		label_table, label_index = [], {}
+		tag_table, tag_index = [], {}
+		def intern(obj, table, index):
+			i = index.get(obj)
+			if i is None:
+				i = index[obj] = len(table)
+				table.append(obj)
+			return i
+
+		offsets = array(CompactFSA.TYPECODE, [0])
+		targets = array(CompactFSA.TYPECODE)
+		labels = array(CompactFSA.TYPECODE)
+		tags = array(CompactFSA.TYPECODE)
+		for state in order:
+			for label, end, tag in self.__transitions[state]:
+				labels.append(intern(label, label_table, label_index))
+				targets.append(numbers[end])
+				tags.append(intern(tag, tag_table, tag_index))
+			offsets.append(len(targets))
+		if self.__initial_state is None:
+			initial = None
+		else:
+			initial = numbers[self.__initial_state]
+		final = frozenset([numbers[f] for f in self.__final_states])
+		return CompactFSA(initial, final, offsets, targets, labels, tags, tuple(label_table), tuple(tag_table), tuple(order))
 	#}
 
 
+_HEADER = struct.Struct("<4sHHiiiii")
+
+
+def _read_header(data):
+	"""
+	Check the header of a compiled FSA.
+
+	@return: The initial state, the counts of the items of each column and the size of the tables.
+	@rtype: tuple (int, list of int, int)
+	@raise ValueError: Fired if the header is missing or the format is not supported.
+	"""
+	if len(data) < _HEADER.size:
+		raise ValueError("Truncated compiled FSA")
+	magic, version, reserved, initial, states, transitions, finals, size = _HEADER.unpack(data)
+	if magic != CompactFSA.MAGIC:
+		raise ValueError("Not a compiled FSA")
+	if version != CompactFSA.VERSION:
+		raise ValueError("Unsupported compiled FSA version: %d" % version)
+	if initial < 0:
+		initial = None
+	return initial, [states + 1, transitions, transitions, transitions, finals], size
+
+
+def _encode(column):
+	"""
+	Encode a column as little-endian 32-bit integers.
+	"""
+	a = array(CompactFSA.TYPECODE, column)
+	if sys.byteorder != "little":
+		a.byteswap()
+	return a.tostring()
+
+
+def _decode(data):
+	"""
+	Decode a column of little-endian 32-bit integers.
+	"""
+	a = array(CompactFSA.TYPECODE)
+	a.fromstring(data[:len(data) - len(data) % a.itemsize])
+	if sys.byteorder != "little":
+		a.byteswap()
+	return a
+
+
+class _MappedColumn(object):
+	"""
+	A read-only column of little-endian 32-bit integers, read from a buffer when indexed or sliced.
+	"""
+	def __init__(self, buffer, position, length):
+		self.__buffer = buffer
+		self.__position = position
+		self.__length = length
+
+	def __len__(self):
+		return self.__length
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			start, stop, step = index.indices(self.__length)
+			if step != 1:
+				return self[start:stop][::step]
+			if stop <= start:
+				return ()
+			return struct.unpack_from("<%di" % (stop - start), self.__buffer, self.__position + 4 * start)
+		if index < 0:
+			index += self.__length
+		if not 0 <= index < self.__length:
+			raise IndexError(index)
+		return struct.unpack_from("<i", self.__buffer, self.__position + 4 * index)[0]
+
+	def __reduce__(self):
+		return (array, (CompactFSA.TYPECODE, list(self[:])))
+
+
+class CompactFSA(object):
+	"""
+	An immutable FSA, where states are dense integers and transitions are stored in arrays.
+
+	Transitions are kept in I{compressed sparse row} form:
+	the transitions departing from state M{i} are those between M{offsets[i]} and M{offsets[i+1]}
+	in the C{targets}, C{labels} and C{tags} columns; labels and tags are indices in their tables.
+
+	Instances are created by L{FSA.freeze} and support the read-only part of the FSA interface.
+	They can be L{saved<dump>} in a binary format, then L{loaded<load>} or L{mapped<map>} into memory.
+	"""
+
+	TYPECODE = "i"
+	"""
+	The type code of the arrays storing the transitions.
+	"""
+
+	MAGIC = "PLFA"
+	"""
+	The string opening the files written by L{dump}.
+	"""
+
+	VERSION = 1
+	"""
+	The version of the format written by L{dump}.
+	"""
+
+	def __init__(self, initial, final, offsets, targets, labels, tags, label_table, tag_table, names = None):
+		"""
+		Create a frozen FSA from its columns.
+		Use L{FSA.freeze} instead of calling this constructor directly.
+
+		@param initial: The initial state.
+		@type initial: int
+		@param final: The final states.
+		@type final: frozenset of int
+		@param offsets: The offset of the first transition of each state, followed by the count of transitions.
+		@type offsets: array
+		@param targets: The end state of each transition.
+		@type targets: array
+		@param labels: The index of the label of each transition.
+		@type labels: array
+		@param tags: The index of the tag of each transition.
+		@type tags: array
+		@param label_table: The distinct labels.
+		@type label_table: tuple
+		@param tag_table: The distinct tags.
+		@type tag_table: tuple
+		@param names: The state of the original FSA corresponding to each state, if known.
+		@type names: tuple
+		"""
+		self.__initial_state = initial
+		self.__final_states = final
+		self.__offsets = offsets
+		self.__targets = targets
+		self.__labels = labels
+		self.__tags = tags
+		self.__label_table = label_table
+		self.__tag_table = tag_table
+		self.__names = names
+
+	def __setstate__(self, state):
+		"""
+		Restore a pickled state, where frozen FSAs pickled by earlier versions have no original state names.
+		"""
+		self.__names = None
+		self.__dict__.update(state)
+
+	def __len__(self):
+		"""
+		Return the number of states of the FSA.
+		@rtype: int
+		"""
+		return len(self.__offsets) - 1
+
+	def states(self):
+		"""
+		Return M{S}, the states of the FSA.
+		@rtype: sequence of int
+		"""
+		return xrange(len(self))
+
+	def has_state(self, state):
+		"""
+		Verify the existence of a state in M{S}.
+
+		@param state: A state.
+		@type state: int
+		@rtype: bool
+		"""
+		return isinstance(state, (int, long)) and 0 <= state < len(self)
+
+	def get_initial(self):
+		"""
+		Return the initial state M{s}.
+
+		@rtype: int
+		"""
+		return self.__initial_state
+
+	def get_final(self):
+		"""
+		Return the sets of final states M{F}.
+
+		@rtype: frozenset of int
+		"""
+		return self.__final_states
+
+	def original_state(self, state):
+		"""
+		Return the state of the FSA that was L{frozen<FSA.freeze>} corresponding to a state.
+		The original states are not L{saved<dump>}: FSAs read from files return the state itself.
+
+		@param state: An existing state.
+		@type state: int
+		@rtype: hashable
+		"""
+		if self.__names is None:
+			return state
+		return self.__names[state]
+
+	def transitions_from(self, start):
+		"""
+		Return M{(S{lambda}(1), e, S{lambda}(2))} where M{e S{isin} S{delta}(C{start}, S{lambda})}
+
+		@param start: An existing state.
+		@type start: int
+		@return: a list of transitions
+		@rtype: list of C{(label, end, tag)} tuples
+		@raise StateError: Fired if the state does not exist.
+		"""
+		if not self.has_state(start):
+			raise StateError(start)
+		lo, hi = self.__offsets[start], self.__offsets[start + 1]
+		label_table, tag_table = self.__label_table, self.__tag_table
+		return [(label_table[label], end, tag_table[tag]) for label, end, tag in izip(self.__labels[lo:hi], self.__targets[lo:hi], self.__tags[lo:hi])]
+
+	def iter_transitions(self):
+		"""
+		Return an iterator on all transitions.
+
+		@rtype: iteration of C{(start, label, end, tag)} tuples
+		"""
+		for state in self.states():
+			for label, end, tag in self.transitions_from(state):
+				yield (state, label, end, tag)
+
+	def labels(self):
+		"""
+		Return the table of the distinct labels.
+
+		@rtype: tuple
+		"""
+		return self.__label_table
+
+	def tags(self):
+		"""
+		Return the table of the distinct tags.
+
+		@rtype: tuple
+		"""
+		return self.__tag_table
+
+	def is_reduced(self):
+		"""
+		Evaluate if the FSA is I{reduced}.
+
+		@see: L{FSA.is_reduced}
+		@rtype: bool
+		"""
+		epsilons = set([i for i, label in enumerate(self.__label_table) if label == EPSILON])
+		for state in self.states():
+			lo, hi = self.__offsets[state], self.__offsets[state + 1]
+			t = set(zip(self.__labels[lo:hi], self.__tags[lo:hi]))
+			if len(t) < hi - lo:
+				return False
+			for label, tag in t:
+				if label in epsilons:
+					return False
+		return True
+
+	def is_minimized(self):
+		"""
+		Evaluate if the FSA is I{minimized}.
+
+		@see: L{FSA.is_minimized}
+		@rtype: bool
+		"""
+		t = set()
+		for state in self.states():
+			lo, hi = self.__offsets[state], self.__offsets[state + 1]
+			fv = frozenset(zip(self.__labels[lo:hi], self.__targets[lo:hi], self.__tags[lo:hi]))
+			fv = (state in self.__final_states, fv)
+			if fv in t:
+				return False
+			else:
+				t.add(fv)
+		return True
+
+	def dump(self, file):
+		"""
+		Write the FSA to a file, in a binary format.
+
+		The format consists of a header, followed by the columns and by the label and tag tables:
+			- the header has the L{MAGIC} string, the L{VERSION} of the format, the initial state (M{-1} if missing),
+			the counts of states, transitions and final states, and the size of the tables;
+			- the columns C{offsets}, C{targets}, C{labels}, C{tags} and the final states are arrays of little-endian 32-bit integers;
+			- the tables are a Python I{pickle} of the label table and of the tag table.
+
+		@param file: A file open for writing in binary mode.
+		@type file: file
+		@see: L{load}, L{map}
+		"""
+		tables = pickle.dumps((self.__label_table, self.__tag_table), -1)
+		final = sorted(self.__final_states)
+		initial = self.__initial_state
+		if initial is None:
+			initial = -1
+		file.write(_HEADER.pack(self.MAGIC, self.VERSION, 0, initial, len(self), len(self.__targets), len(final), len(tables)))
+		for column in (self.__offsets, self.__targets, self.__labels, self.__tags, final):
+			file.write(_encode(column))
+		file.write(tables)
+
+	def load(cls, file):
+		"""
+		Read an FSA written by L{dump} from a file.
+
+		@param file: A file open for reading in binary mode.
+		@type file: file
+		@raise ValueError: Fired if the file does not contain an FSA in a supported format.
+		@rtype: CompactFSA
+		"""
+		initial, counts, size = _read_header(file.read(_HEADER.size))
+		columns = [_decode(file.read(4 * n)) for n in counts]
+		tables = file.read(size)
+		if len(tables) < size or [len(c) for c in columns] != counts:
+			raise ValueError("Truncated compiled FSA")
+		label_table, tag_table = pickle.loads(tables)
+		offsets, targets, labels, tags, final = columns
+		return cls(initial, frozenset(final), offsets, targets, labels, tags, label_table, tag_table)
+	load = classmethod(load)
+
+	def map(cls, filename):
+		"""
+		Map an FSA written by L{dump} from a file into memory, read-only.
+
+		The columns are read from the mapped file when needed, with no per-transition objects;
+		processes mapping the same file share its pages.
+		Only the final states and the label and tag tables are loaded.
+
+		@param filename: The name of the file to map.
+		@type filename: str
+		@raise ValueError: Fired if the file does not contain an FSA in a supported format.
+		@rtype: CompactFSA
+		"""
+		f = open(filename, "rb")
+		try:
+			buffer = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+		finally:
+			f.close()
+		initial, counts, size = _read_header(buffer[:_HEADER.size])
+		position = _HEADER.size
+		columns = []
+		for n in counts:
+			columns.append(_MappedColumn(buffer, position, n))
+			position += 4 * n
+		if position + size > len(buffer):
+			raise ValueError("Truncated compiled FSA")
+		label_table, tag_table = pickle.loads(buffer[position:position + size])
+		offsets, targets, labels, tags, final = columns
+		return cls(initial, frozenset(final[:]), offsets, targets, labels, tags, label_table, tag_table)
+	map = classmethod(map)
+
+	def freeze(self):
+		"""
+		Return the FSA itself, since it is already frozen.
+
+		@rtype: CompactFSA
+		"""
+		return self
+
+	def thaw(self):
+		"""
+		Create a mutable L{FSA} equivalent to the current.
+
+		@rtype: FSA
+		"""
+		fsa = FSA()
+		for state in self.states():
+			fsa.add_state(state)
+		if self.__initial_state is not None:
+			fsa.set_initial(self.__initial_state)
+		for state in self.__final_states:
+			fsa.set_final(state)
+		for start, label, end, tag in self.iter_transitions():
+			fsa.add_transition(start, label, end, tag)
+		return fsa
+
+	def __repr__(self):
+		"""
+		Represent the FSA, as a colection of states and transitions.
+
+		@rtype: str
+		"""
+		return repr(self.thaw()).replace(FSA.__name__, self.__class__.__name__, 1)
+
+
+class StateCache(object):
+	"""
+	A bounded mapping, evicting the least recently used entries when full.
+
+	It keeps data that can be computed again from a state, such as the transitions of a L{LazyDFA} state.
+	Every use of an entry is stamped by a counter and queued; the stamps of the entries used again are left in the queue
+	and skipped when evicting, and the queue is compacted when it grows beyond twice the capacity.
+	"""
+	def __init__(self, capacity):
+		"""
+		Create an empty cache.
+
+		@param capacity: The maximum count of entries.
+		@type capacity: int
+		@raise ValueError: Fired if the capacity is not positive.
+		"""
+		if capacity < 1:
+			raise ValueError("Cache capacity must be positive: %r" % capacity)
+		self.capacity = capacity
+		self.__entries = {} #key -> (stamp, value)
+		self.__uses = deque() #(stamp, key), from the least recent
+		self.__clock = 0
+
+	def __use(self, key, value):
+		"""
+		Store an entry with a new stamp.
+		"""
+		self.__clock += 1
+		self.__entries[key] = (self.__clock, value)
+		self.__uses.append((self.__clock, key))
+		if len(self.__uses) > 2 * self.capacity:
+			entries = self.__entries
+			self.__uses = deque([(stamp, k) for stamp, k in self.__uses if k in entries and entries[k][0] == stamp])
+
+	def get(self, key):
+		"""
+		Return the value of an entry, marking it as the most recently used.
+
+		@return: The value, or C{None} if the entry is missing.
+		@rtype: object
+		"""
+		entry = self.__entries.get(key)
+		if entry is None:
+			return None
+		self.__use(key, entry[1])
+		return entry[1]
+
+	def __setitem__(self, key, value):
+		"""
+		Add an entry, evicting the least recently used entry if the cache is full.
+		"""
+		self.__use(key, value)
+		entries = self.__entries
+		while len(entries) > self.capacity:
+			stamp, k = self.__uses.popleft()
+			if k in entries and entries[k][0] == stamp:
+				del entries[k]
+
+	def __contains__(self, key):
+		return key in self.__entries
+
+	def keys(self):
+		"""
+		Return the keys of the entries, from the least recently used.
+		@rtype: list
+		"""
+		entries = self.__entries
+		return [k for stamp, k in self.__uses if k in entries and entries[k][0] == stamp]
+
+	def __len__(self):
+		"""
+		Return the count of entries.
+		@rtype: int
+		"""
+		return len(self.__entries)
+
+
+class LazyDFA(object):
+	"""
+	A deterministic automaton equivalent to an FSA, whose states are built on demand.
+
+	Each state stands for a subset of the FSA states, as in L{FSA.reduced}, but the subset construction
+	takes place only when the transitions of a state are requested, typically while parsing.
+	States are the subsets themselves, as frozensets, so that nothing is kept for the states reached but their transitions,
+	which are held in a bounded L{cache<StateCache>}, and rebuilt when they have been evicted:
+	memory is bounded, however many states are visited.
+
+	The automaton is deterministic, but not minimized; it supports the read-only part of the FSA interface that parsers use.
+	The wrapped FSA must not be modified afterwards.
+	"""
+
+	CACHE_SIZE = 4096
+	"""
+	The default count of states whose transitions are kept.
+	"""
+
+	def __init__(self, nfa, cache_size = None):
+		"""
+		Create a lazy deterministic automaton for an FSA; no transitions are built.
+
+		@param nfa: The FSA to determinize.
+		@type nfa: FSA
+		@param cache_size: The count of states whose transitions are kept; if C{None}, L{CACHE_SIZE} is used.
+		@type cache_size: int
+		"""
+		self.__nfa = nfa
+		self.__final_states = _SubsetFinal(nfa.get_final())
+		self.__cache = StateCache(cache_size or self.CACHE_SIZE)
+		if nfa.get_initial() is None:
+			self.__initial_state = frozenset()
+		else:
+			self.__initial_state = frozenset(nfa.epsilon_closure([nfa.get_initial()]))
+
+	def __len__(self):
+		"""
+		Return the number of states whose transitions are cached.
+		@rtype: int
+		"""
+		return len(self.__cache)
+
+	def states(self):
+		"""
+		Return the states whose transitions are cached.
+		@rtype: sequence of frozenset
+		"""
+		return self.__cache.keys()
+
+	def has_state(self, state):
+		"""
+		Verify if an object can be a state, i.e. it is a subset of the states of the wrapped FSA.
+
+		@param state: A state.
+		@type state: frozenset
+		@rtype: bool
+		"""
+		return isinstance(state, frozenset)
+
+	def get_initial(self):
+		"""
+		Return the initial state M{s}.
+
+		@rtype: frozenset
+		"""
+		return self.__initial_state
+
+	def get_final(self):
+		"""
+		Return the final states, as a container testing if a subset has a final state of the wrapped FSA.
+
+		@rtype: container of frozenset
+		"""
+		return self.__final_states
+
+	def subset(self, state):
+		"""
+		Return the states of the wrapped FSA a state stands for, sorted.
+
+		@param state: A state.
+		@type state: frozenset
+		@rtype: tuple
+		@raise StateError: Fired if the object is not a state.
+		"""
+		if not self.has_state(state):
+			raise StateError(state)
+		return tuple(sorted(state))
+
+	def transitions_from(self, start):
+		"""
+		Return the transitions departing from a state, building them if they are not cached.
+		Transitions with the same label and tag in the wrapped FSA are merged, as in L{FSA.reduced}.
+
+		@param start: A state.
+		@type start: frozenset
+		@return: a list of transitions
+		@rtype: list of C{(label, end, tag)} tuples
+		@raise StateError: Fired if the object is not a state.
+		"""
+		transitions = self.__cache.get(start)
+		if transitions is None:
+			symbols, moves = [], {}
+			for s in self.subset(start):
+				for label, end, tag in self.__nfa.transitions_from(s):
+					if label != EPSILON:
+						mv = moves.get((label, tag))
+						if mv is None:
+							symbols.append((label, tag))
+							moves[(label, tag)] = [end]
+						else:
+							mv.append(end)
+			transitions = [(label, frozenset(self.__nfa.epsilon_closure(moves[(label, tag)])), tag) for label, tag in symbols]
+			self.__cache[start] = transitions
+		return transitions
+
+	def cache_size(self):
+		"""
+		Return the count of states whose transitions are kept.
+
+		@rtype: int
+		"""
+		return self.__cache.capacity
+
+	def is_reduced(self):
+		"""
+		Evaluate if the automaton is I{reduced}, which is true by construction.
+
+		@rtype: bool
+		"""
+		return True
+
+	def __repr__(self):
+		"""
+		Return a short string representation of the automaton.
+		@rtype: str
+		"""
+		return "%s{%d states cached}" % (self.__class__.__name__, len(self))
+
+
+class _SubsetFinal(object):
+	"""
+	The final states of a L{LazyDFA}: the subsets having a final state of the wrapped FSA.
+	"""
+	def __init__(self, final):
+		self.__final = final
+
+	def __contains__(self, state):
+		for s in state:
+			if s in self.__final:
+				return True
+		return False
+
+
 class ParseError(StandardError):
 	"""
 	Exception indicating a parsing error.
@@ -578,7 +1584,7 @@ class ParseError(StandardError):
 		if len(self.tokens)>0:
 			return "[" + " ".join([`t` for t in self.tokens[:-1]]) + " ?" + repr(self.tokens[-1]) + "]@"+ str(self.state)
 		else:
-			return "[]@%d" % self.state
+			return "[]@" + str(self.state)
 
 
 class ExpectedStopError(ParseError):
@@ -598,63 +1604,215 @@ class Parser(object):
 		"""
 		Create a new parser based on the given FSA.
 		The FSA must be deterministic, i.e. reduced and minimized.
+		The parser runs on a L{frozen<FSA.freeze>} copy of the FSA.
+		A L{LazyDFA} is used as it is, since it is deterministic by construction.
 
 		@param fsa: The deterministic FSA to use for parsing.
-		@type fsa: FSA
+		@type fsa: FSA, CompactFSA or LazyDFA
 		@raise ValueError: Fired if the FSA is not deterministic.
 		"""
-		rm = 0
-		if not fsa.is_reduced():
-			rm = 1
-		if not fsa.is_minimized():
-			rm += 2
-		if rm>0:
-			err_str = ("not reduced", "not minimized", "neither reduced nor minimized")
-			raise ValueError("FSA is not deterministic: it is %s." % err_str[rm-1])
+		if not isinstance(fsa, LazyDFA):
+			fsa = fsa.freeze()
+			rm = 0
+			if not fsa.is_reduced():
+				rm = 1
+			if not fsa.is_minimized():
+				rm += 2
+			if rm>0:
+				err_str = ("not reduced", "not minimized", "neither reduced nor minimized")
+				raise ValueError("FSA is not deterministic: it is %s." % err_str[rm-1])
 		self.__fsa = fsa
 
 	def __call__(self, tokens):
 		"""
 		Parse the given sequence.
 
+		The result of parsing from each C{(index, state)} pair, either the following options or the longest parse error,
+		is memoized during the call, so that the pairs reached by different paths are parsed once.
+
 		@param tokens: The sequence to parse.
 		@type tokens: sequence
 		@raise ParseError: If parsing fails for an unexpected token or stop.
 		@return: A tree of the possible tags encountered.
 		@rtype: L{OptionTree<optiontree.OptionTree>}
 		"""
-		def parse_from(fsa, tokens, index, state):
-			output = OptionTree()
-			expected_final = index == len(tokens)
-			is_final = state in fsa.get_final()
-			if expected_final:
-				if is_final:
-					return output
+		def parse_from(index, state):
+			key = (index, state)
+			if key in memo:
+				following = memo[key]
+				if isinstance(following, ParseError):
+					raise following
+				return following
+			try:
+				following = memo[key] = options_from(index, state)
+			except ParseError, pe:
+				memo[key] = pe
+				raise
+			return following
+
+		def options_from(index, state):
+			if index == len(tokens):
+				if state in final:
+					return []
 				else:
-					raise ExpectedStopError(tokens[:index+1], state)
-			transitions = fsa.transitions_from(state)
+					raise ExpectedStopError(tokens[:index+1], self.original_state(state))
 			token = tokens[index]
-			matching = [(label, end, tag) for label, end, tag in transitions if self.match(label, token)]
+			matching = [(label, end, tag) for label, end, tag in self.candidates(state, token) if self.match(label, token)]
 			if len(matching) == 0:
-				raise ParseError(tokens[:index+1], state)
+				raise ParseError(tokens[:index+1], self.original_state(state))
 
+			output = []
 			m_pe = None
 			for label, end, tag in matching:
 				try:
-					following = parse_from(fsa, tokens, index + 1, end)
-					following.element = (self.process(label, token), tag)
-					output.append(following)
+					following = parse_from(index + 1, end)
 				except ParseError, pe:
 					if (not m_pe) or len(pe) > len(m_pe):
 						m_pe = pe
+				else:
+					output.append(OptionTree((self.process(label, token), tag), following))
 			if len(output) == 0:
 				if m_pe:
 					raise m_pe
 				else:
-					raise ParseError(tokens[:index+1], state)
+					raise ParseError(tokens[:index+1], self.original_state(state))
 			return output
 
-		return parse_from(self.__fsa, tokens, 0, self.__fsa.get_initial())
+		memo = {}
+		final = self.__fsa.get_final()
+		return OptionTree(None, parse_from(0, self.__fsa.get_initial()))
+
+	def parse_forest(self, tokens):
+		"""
+		Parse the given sequence with no recursion, returning a shared forest.
+
+		The tokens are L{fed<ParseSession.feed>} from left to right to a new L{session<start>},
+		then the transitions leading to a final state at the end are collected backwards into a L{ParseForest<forest.ParseForest>},
+		whose nodes are C{(index, state)} pairs.
+		The cost is bounded by the count of tokens times the count of transitions, even for ambiguous sequences.
+
+		@param tokens: The sequence to parse.
+		@type tokens: sequence
+		@raise ParseError: If parsing fails for an unexpected token or stop.
+		@return: A forest of the possible tags encountered; it can be L{converted<forest.ParseForest.to_option_tree>} into the same tree returned by L{__call__}.
+		@rtype: L{ParseForest<forest.ParseForest>}
+		"""
+		session = self.start()
+		for token in tokens:
+			session.feed(token)
+		return session.forest()
+
+	def parse_lattice(self, lattice):
+		"""
+		Parse all the sequences of a lattice at once, such as a L{word lattice<tokenizer.Tokenizer.lattice>}.
+
+		The lattice is a L{ParseForest<forest.ParseForest>} whose elements are the tokens.
+		Its nodes are visited from the root, each before its successors, and the states of the FSA reached at each node are advanced along its options,
+		so that the prefixes shared by many sequences are parsed once, and the sequences converging to a node share its states.
+		The transitions leading to a final state at the end nodes are then collected backwards, as in L{parse_forest}.
+
+		@param lattice: The lattice of the sequences to parse.
+		@type lattice: L{ParseForest<forest.ParseForest>}
+		@raise ParseError: If every sequence fails for an unexpected token or stop; the error is the longest one, as raised by L{__call__}.
+		@return: A forest of the possible tags encountered, whose nodes are C{(lattice node, state)} pairs;
+			its sequences are the parsings of all the sequences of the lattice.
+		@rtype: L{ParseForest<forest.ParseForest>}
+		"""
+		def tokens_to(key):
+			tokens = []
+			depth, previous, token = reached[key]
+			while previous is not None:
+				tokens.append(token)
+				depth, previous, token = reached[previous]
+			tokens.reverse()
+			return tokens
+
+		final = self.__fsa.get_final()
+		initial = (lattice.root, self.__fsa.get_initial())
+		reached = {initial: (0, None, None)} #(node, state) -> (longest count of tokens reaching it, previous pair, token)
+		active = {lattice.root: [initial[1]]}
+		steps = {}
+		live = set()
+		error = ExpectedStopError([], self.original_state(initial[1]))
+		order = lattice.nodes()
+		for node in order:
+			states = active.pop(node, [])
+			options = lattice.options(node)
+			if not options:
+				for state in states:
+					if state in final:
+						live.add((node, state))
+					elif reached[(node, state)][0] > len(error):
+						error = ExpectedStopError(tokens_to((node, state)), self.original_state(state))
+				continue
+			step = steps[node] = []
+			for state in states:
+				key = (node, state)
+				depth = reached[key][0] + 1
+				for token, successor in options:
+					matched = False
+					for label, end, tag in self.candidates(state, token):
+						if self.match(label, token):
+							matched = True
+							target = (successor, end)
+							step.append((key, (self.process(label, token), tag), target))
+							if target not in reached:
+								reached[target] = (depth, key, token)
+								active.setdefault(successor, []).append(end)
+							elif reached[target][0] < depth:
+								reached[target] = (depth, key, token)
+					if not matched and depth > len(error):
+						error = ParseError(tokens_to(key) + [token], self.original_state(state))
+		if not live:
+			raise error
+		forest = ParseForest(initial)
+		for key in live:
+			forest.add_node(key)
+		for node in reversed(order):
+			for start, element, end in steps.get(node, ()):
+				if end in live:
+					forest.add_option(start, element, end)
+					live.add(start)
+		return forest
+
+	def start(self):
+		"""
+		Start an incremental parsing, where tokens are fed one at a time.
+
+		@rtype: L{ParseSession}
+		"""
+		return ParseSession(self)
+
+	def get_fsa(self):
+		"""
+		Return the frozen or lazy FSA used for parsing.
+
+		@rtype: CompactFSA or LazyDFA
+		"""
+		return self.__fsa
+
+	def original_state(self, state):
+		"""
+		Return the state of the FSA given to the constructor corresponding to a state of the FSA used for parsing,
+		as reported by L{parse errors<ParseError>}.
+		The states of a L{LazyDFA} and of FSAs L{read<CompactFSA.load>} from files have no other name.
+
+		@rtype: hashable
+		"""
+		if isinstance(self.__fsa, CompactFSA):
+			return self.__fsa.original_state(state)
+		return state
+
+	def candidates(self, state, token):
+		"""
+		Return the transitions departing from a state that might match a token.
+		Only the candidates are verified by L{match}.
+		Override this method to skip the transitions that can not match, without changing their order.
+
+		@return: All the transitions departing from the state.
+		@rtype: list of C{(label, end, tag)} tuples
+		"""
+		return self.__fsa.transitions_from(state)
 
 	def match(self, label, token):
 		"""
@@ -676,4 +1834,129 @@ class Parser(object):
 		"""
 		return token
 	def __repr__(self):
-		return "Parse:"+`self.__fsa`
\ No newline at end of file
+		return "Parse:"+`self.__fsa`
+
+
+class ParseSession(object):
+	"""
+	An incremental parsing, where tokens are fed one at a time.
+
+	The session keeps the set of the active states and, for each token, the matching transitions,
+	so that each token costs as much as the transitions departing from the active states.
+	It relies on the L{candidates<Parser.candidates>}, L{match<Parser.match>} and L{process<Parser.process>} methods of its parser.
+	"""
+	def __init__(self, parser):
+		"""
+		Create a session where no token has been fed yet.
+		Use L{Parser.start} instead of calling this constructor directly.
+
+		@param parser: The parser providing the FSA and the matching logics.
+		@type parser: Parser
+		"""
+		self.__parser = parser
+		self.__fsa = parser.get_fsa()
+		self.__tokens = []
+		self.__steps = [] #steps[index] = [(start, element, end)...]
+		self.__active = [self.__fsa.get_initial()]
+
+	def __len__(self):
+		"""
+		Return the count of the tokens fed.
+		@rtype: int
+		"""
+		return len(self.__tokens)
+
+	def feed(self, token):
+		"""
+		Advance the active states with a token.
+		If the token is not expected, the session is left unchanged.
+
+		@param token: The next token.
+		@type token: object
+		@raise ParseError: If the token is not expected.
+		"""
+		parser = self.__parser
+		step = []
+		following = []
+		reached = set()
+		for state in self.__active:
+			for label, end, tag in parser.candidates(state, token):
+				if parser.match(label, token):
+					step.append((state, (parser.process(label, token), tag), end))
+					if end not in reached:
+						reached.add(end)
+						following.append(end)
+		if not following:
+			raise ParseError(self.__tokens + [token], parser.original_state(self.__active[0]))
+		self.__tokens.append(token)
+		self.__steps.append(step)
+		self.__active = following
+
+	def active_states(self):
+		"""
+		Return the states reached by the tokens fed so far.
+
+		@rtype: tuple
+		"""
+		return tuple(self.__active)
+
+	def can_finish(self):
+		"""
+		Verify if the tokens fed so far form a complete sequence.
+
+		@rtype: bool
+		"""
+		final = self.__fsa.get_final()
+		for state in self.__active:
+			if state in final:
+				return True
+		return False
+
+	def expected_labels(self):
+		"""
+		Return the labels of the transitions departing from the active states, i.e. the labels a next token could match.
+
+		@rtype: list of labels
+		"""
+		labels = []
+		seen = set()
+		for state in self.__active:
+			for label, end, tag in self.__fsa.transitions_from(state):
+				if label not in seen:
+					seen.add(label)
+					labels.append(label)
+		return labels
+
+	def forest(self):
+		"""
+		Collect the complete parsings of the tokens fed so far.
+
+		@raise ExpectedStopError: If the tokens fed so far do not form a complete sequence.
+		@return: A forest of the possible tags encountered, whose nodes are C{(index, state)} pairs.
+		@rtype: L{ParseForest<forest.ParseForest>}
+		"""
+		final = self.__fsa.get_final()
+		live = set([state for state in self.__active if state in final])
+		if not live:
+			raise ExpectedStopError(self.__tokens, self.__parser.original_state(self.__active[0]))
+		forest = ParseForest((0, self.__fsa.get_initial()))
+		for state in live:
+			forest.add_node((len(self.__tokens), state))
+		for index in range(len(self.__steps) - 1, -1, -1):
+			reaching = set()
+			for start, element, end in self.__steps[index]:
+				if end in live:
+					forest.add_option((index, start), element, (index + 1, end))
+					reaching.add(start)
+			live = reaching
+		return forest
+
+	def result(self):
+		"""
+		Return the complete parsings of the tokens fed so far.
+
+		@raise ExpectedStopError: If the tokens fed so far do not form a complete sequence.
+		@return: A tree of the possible tags encountered, as returned by L{Parser.__call__}.
+		@rtype: L{OptionTree<optiontree.OptionTree>}
+		"""
+		return self.forest().to_option_tree()
@@ -12,7 +12,13 @@ The notation used to model rules is Extended Backus-Naur (EBNF) rules, supported
 
 __docformat__ = "epytext en"
 
-from fsa import FSA, Parser
+from fsa import FSA, Parser, LazyDFA, StateCache, ParseError, ExpectedStopError
+from forest import ParseForest
+import hashlib
+import os
+import pickle
+import stat
+import tempfile
 
 class GrammarError(ValueError):
 	"""
@@ -31,7 +37,178 @@ class CyclicReferenceError(GrammarError):
 	def __str__(self):
 		return "<%s>(<%s>)" % self.args
 
+class GrammarAnalysis(object):
+	"""
+	The report on the structure of a grammar, as seen from its start symbol.
+
+	It is built by L{Grammar.analyze} in a single pass and it is kept by the grammar until its rules are modified.
+	The report provides:
+		- C{start}: the start symbol;
+		- C{order}: the defined symbols reachable from the start symbol, each following the symbols it references, unless they are in a cycle;
+		- C{undefined}: the symbols referenced but not defined;
+		- C{cycles}: the groups of symbols referencing each other, directly or not;
+		- the maximum L{depth} of each symbol with no recursion.
+	"""
+	def __init__(self, start, order, depths, undefined, cycles, dependencies):
+		"""
+		Create a report.
+		Use L{Grammar.analyze} instead of calling this constructor directly.
+		"""
+		self.start = start
+		self.order = tuple(order)
+		self.undefined = frozenset(undefined)
+		self.cycles = tuple(cycles)
+		self.__depths = depths
+		self.__dependencies = dependencies
+
+	def depth(self, symbol = None):
+		"""
+		Return the maximum depth of the references from a symbol, ignoring the references that close a cycle.
+
+		@param symbol: A reachable symbol; if C{None}, the start symbol.
+		@type symbol: str
+		@rtype: int
+		@raise KeyError: If the symbol is not reachable from the start symbol.
+		"""
+		if symbol is None:
+			symbol = self.start
+		return self.__depths[symbol]
+
+	def dependencies(self, symbol):
+		"""
+		Return the symbols directly referenced by a reachable symbol.
+
+		@param symbol: A reachable symbol.
+		@type symbol: str
+		@rtype: tuple of str
+		@raise KeyError: If the symbol is not reachable from the start symbol.
+		"""
+		return self.__dependencies[symbol]
+
+	def is_valid(self):
+		"""
+		Check if the grammar can be compiled.
+
+		@rtype: bool
+		"""
+		return self.start is not None and not self.undefined and not self.cycles
+
+	def check(self):
+		"""
+		Raise the error for the first anomaly found, if any.
+
+		@raise GrammarError: If no start symbol is defined.
+		@raise CyclicReferenceError: If some symbols reference each other.
+		@raise UndefinedSymbolError: If some symbols are referenced but not defined.
+		"""
+		if self.start is None:
+			raise GrammarError("No start symbol defined")
+		if self.cycles:
+			cycle = self.cycles[0]
+			for dependency in self.__dependencies[cycle[0]]:
+				if dependency in cycle:
+					raise CyclicReferenceError(cycle[0], dependency)
+		if self.undefined:
+			raise UndefinedSymbolError(sorted(self.undefined)[0])
+
+	def __repr__(self):
+		"""
+		Return a short string representation of the report.
+		@rtype: str
+		"""
+		if self.start is None:
+			return "%s{no start symbol}" % self.__class__.__name__
+		return "%s{<%s>, %d symbols, depth %d, %d undefined, %d cycles}" % (self.__class__.__name__, self.start, len(self.__depths), self.depth(), len(self.undefined), len(self.cycles))
+
 class _GrammarParser(Parser):
+	"""
+	A parser for compiled grammars, whose labels are L{literals<bnf.Literal>}.
+
+	For every state, the departing transitions are indexed by the L{dispatch key<bnf.Literal.dispatch_key>} of their labels,
+	so that a token is only matched against the labels sharing one of its L{dispatch keys<lexicon.Word.dispatch_keys>}
+	and against the labels having no key.
+	States are indexed when first reached, so that a L{memory-mapped<fsa.CompactFSA.load>} FSA is not scanned before parsing;
+	on a L{lazy<fsa.LazyDFA>} FSA, the indices are kept in a bounded cache.
+	The indices are not pickled.
+	"""
+	def __init__(self, fsa):
+		"""
+		Create a parser for a compiled grammar; no state is indexed.
+
+		@param fsa: The deterministic FSA to use for parsing.
+		@type fsa: FSA, CompactFSA or LazyDFA
+		"""
+		Parser.__init__(self, fsa)
+		self.__reset_dispatch()
+
+	def __reset_dispatch(self):
+		"""
+		Create the empty container of the dispatch indices.
+		"""
+		fsa = self.get_fsa()
+		if isinstance(fsa, LazyDFA):
+			self.__dispatch = StateCache(fsa.cache_size())
+		else:
+			self.__dispatch = {}
+
+	def __getstate__(self):
+		"""
+		Return the state to pickle, leaving out the dispatch indices.
+		"""
+		state = self.__dict__.copy()
+		state.pop("_GrammarParser__dispatch", None)
+		return state
+
+	def __setstate__(self, state):
+		"""
+		Restore a pickled state, with no state indexed; parsers pickled by earlier versions have all the indices, which are dropped.
+		"""
+		self.__dict__.update(state)
+		self.__reset_dispatch()
+
+	def __index(self, state):
+		"""
+		Build the dispatch index for a state.
+
+		@return: The transitions having a key, grouped by key, and the transitions having no key; each transition is preceded by its position.
+		@rtype: tuple (dict, list)
+		"""
+		keyed = {}
+		generic = []
+		for position, transition in enumerate(self.get_fsa().transitions_from(state)):
+			key = transition[0].dispatch_key()
+			if key is None:
+				generic.append((position, transition))
+			else:
+				keyed.setdefault(key, []).append((position, transition))
+		index = self.__dispatch[state] = (keyed, generic)
+		return index
+
+	def candidates(self, state, token):
+		"""
+		Return the transitions departing from a state whose labels might match a token, in their original order.
+
+		@return: The transitions whose label key is one of the token keys, and those with no key.
+		@rtype: list of C{(label, end, tag)} tuples
+		"""
+		index = self.__dispatch.get(state)
+		if index is None:
+			index = self.__index(state)
+		keyed, generic = index
+		dispatch_keys = getattr(token, "dispatch_keys", None)
+		if dispatch_keys is None:
+			return Parser.candidates(self, state, token)
+		found = []
+		for key in dispatch_keys():
+			group = keyed.get(key)
+			if group:
+				found.extend(group)
+		if not found:
+			return [transition for position, transition in generic]
+		found.extend(generic)
+		found.sort()
+		return [transition for position, transition in found]
+
 	def match(self, label, token):
 		"""
 		Verify if a label in the FSA matches a token, calling the C{match} method of the label.
@@ -52,10 +229,408 @@ class _GrammarParser(Parser):
 		"""
 		return label.process(token)
 
+class _Call(object):
+	"""
+	The label of a transition calling the automaton of a symbol, in L{recursive<Grammar.compile>} compilings.
+	"""
+	def __init__(self, symbol):
+		self.symbol = symbol
+
+	def __eq__(self, other):
+		return isinstance(other, _Call) and self.symbol == other.symbol
+
+	def __ne__(self, other):
+		return not self.__eq__(other)
+
+	def __hash__(self):
+		return hash(self.__class__) ^ hash(self.symbol)
+
+	def __repr__(self):
+		return "<%s>" % self.symbol
+
+	def dispatch_key(self):
+		return None
+
+
+class _NetworkParser(object):
+	"""
+	A parser for grammars compiled as a I{recursive transition network}:
+	each symbol has its own deterministic FSA, where the references to other symbols are L{call<_Call>} transitions.
+
+	Parsing has two passes.
+	The first one is an Earley recognizer: an item is a symbol, a state of its FSA and the node where the symbol was called,
+	and a symbol is called once per node, whatever the stacks of its callers, so that left recursion and S{epsilon}-cycles need no bound
+	and the work per token does not depend on the depth of the recursion.
+	Items are linked to the items they come from, and the nodes where each call returns are recorded.
+
+	The second pass builds the forest top-down, only following the links leading to a return where the caller expects it.
+	Its configurations carry the full stack of return points and tag prefix, interned as numbers;
+	the configurations reading the same token with the same label and tags are merged, as in a deterministic FSA,
+	so that the parsing results are the same as those of a flat compiling, with no repetitions.
+	A call is not followed if the same call, returning at the same point, is already pending at the same node.
+	"""
+	def __init__(self, start, network):
+		"""
+		Create a parser for a network.
+
+		@param start: The start symbol.
+		@type start: str
+		@param network: The FSA of each symbol.
+		@type network: dict (str -> CompactFSA)
+		"""
+		self.start = start
+		self.__network = network
+
+	def get_network(self):
+		"""
+		Return the FSA of each symbol.
+
+		@rtype: dict (str -> CompactFSA)
+		"""
+		return dict(self.__network)
+
+	def __error_state(self, item):
+		"""
+		Return the symbol and the original state of an item or a configuration, as reported by parse errors.
+		"""
+		symbol, state = item[:2]
+		return (symbol, self.__network[symbol].original_state(state))
+
+	def __recognize(self, lattice):
+		"""
+		Run the Earley pass on a lattice.
+		An item is a tuple C{(symbol, state, origin, node)}.
+
+		@return: The links following each item, the links preceding it,
+		the final items of each call C{(symbol, origin, node)} and the end nodes where the start symbol returns.
+		@rtype: tuple (dict, dict, dict, list)
+		@raise ParseError: If every sequence fails for an unexpected token or stop.
+		"""
+		def tokens_to(node):
+			tokens = []
+			depth, previous, token = reached[node]
+			while previous is not None:
+				tokens.append(token)
+				depth, previous, token = reached[previous]
+			tokens.reverse()
+			return tokens
+
+		def add(item, previous, link):
+			if previous is not None:
+				following.setdefault(previous, []).append((item, link))
+				preceding.setdefault(item, []).append(previous)
+			if item not in seen:
+				seen.add(item)
+				agendas.setdefault(item[3], []).append(item)
+
+		network = self.__network
+		root = lattice.root
+		following = {} #item -> [(next item, link)]
+		preceding = {} #item -> [previous item]
+		waiting = {} #(symbol, origin) -> [(caller item, return state, tag)]
+		returns = {} #(symbol, origin) -> last node where the call returns
+		finals = {} #(symbol, origin, node) -> [final item]
+		seen = set()
+		agendas = {}
+		ends = []
+		reached = {root: (0, None, None)} #node -> (longest count of tokens reaching it, previous node, token)
+		initial = (self.start, network[self.start].get_initial(), root, root)
+		error = ExpectedStopError([], self.__error_state(initial))
+		add(initial, None, None)
+		for node in lattice.nodes():
+			agenda = agendas.get(node)
+			if not agenda:
+				continue
+			i = 0
+			while i < len(agenda):
+				item = agenda[i]
+				i += 1
+				symbol, state, origin, n = item
+				fsa = network[symbol]
+				if state in fsa.get_final():
+					finals.setdefault((symbol, origin, node), []).append(item)
+					if returns.get((symbol, origin)) != node:
+						returns[(symbol, origin)] = node
+						for caller, back, tag in waiting.get((symbol, origin), ()):
+							add((caller[0], back, caller[2], node), caller, (_Call(symbol), tag, origin))
+				for label, end, tag in fsa.transitions_from(state):
+					if isinstance(label, _Call):
+						called = (label.symbol, node)
+						waiting.setdefault(called, []).append((item, end, tag))
+						add((label.symbol, network[label.symbol].get_initial(), node, node), None, None)
+						if returns.get(called) == node:
+							add((symbol, end, origin, node), item, (label, tag, node))
+			del agendas[node]
+			depth = reached[node][0] + 1
+			options = lattice.options(node)
+			if not options:
+				if returns.get((self.start, root)) == node:
+					ends.append(node)
+				elif depth - 1 > len(error):
+					error = ExpectedStopError(tokens_to(node), self.__error_state(agenda[0]))
+			for position, (token, successor) in enumerate(options):
+				matched = False
+				for item in agenda:
+					symbol, state, origin, n = item
+					for label, end, tag in network[symbol].transitions_from(state):
+						if not isinstance(label, _Call) and self.match(label, token):
+							matched = True
+							add((symbol, end, origin, successor), item, (label, tag, position))
+				if matched:
+					if successor not in reached or reached[successor][0] < depth:
+						reached[successor] = (depth, node, token)
+				elif depth > len(error):
+					error = ParseError(tokens_to(node) + [token], self.__error_state(agenda[0]))
+		if not ends:
+			raise error
+		return following, preceding, finals, ends
+
+	def __call__(self, tokens):
+		"""
+		Parse the given sequence.
+
+		@param tokens: The sequence to parse.
+		@type tokens: sequence
+		@raise ParseError: If parsing fails for an unexpected token or stop.
+		@return: A tree of the possible tags encountered.
+		@rtype: L{OptionTree<optiontree.OptionTree>}
+		"""
+		return self.parse_forest(tokens).to_option_tree()
+
+	def parse_forest(self, tokens):
+		"""
+		Parse the given sequence, returning a shared forest whose nodes are C{(index, configurations)} pairs.
+
+		@param tokens: The sequence to parse.
+		@type tokens: sequence
+		@raise ParseError: If parsing fails for an unexpected token or stop.
+		@rtype: L{ParseForest<forest.ParseForest>}
+		"""
+		lattice = ParseForest(0)
+		lattice.add_node(0)
+		for index, token in enumerate(tokens):
+			lattice.add_option(index, token, index + 1)
+		return self.parse_lattice(lattice)
+
+	def parse_lattice(self, lattice):
+		"""
+		Parse all the sequences of a lattice at once, as L{Parser.parse_lattice<fsa.Parser.parse_lattice>} does,
+		returning a shared forest whose nodes are C{(lattice node, configurations)} pairs.
+
+		@param lattice: The lattice of the sequences to parse.
+		@type lattice: L{ParseForest<forest.ParseForest>}
+		@raise ParseError: If every sequence fails for an unexpected token or stop.
+		@rtype: L{ParseForest<forest.ParseForest>}
+		"""
+		network = self.__network
+		following, preceding, finals, ends = self.__recognize(lattice)
+		useful = {}
+		def useful_items(symbol, origin, end):
+			#the items of a call leading to its return at a node
+			key = (symbol, origin, end)
+			items = useful.get(key)
+			if items is None:
+				work = list(finals[key])
+				items = useful[key] = set(work)
+				while work:
+					for previous in preceding.get(work.pop(), ()):
+						if previous not in items:
+							items.add(previous)
+							work.append(previous)
+			return items
+
+		configurations = [] #(symbol, state, origin, end, prefix, return point)
+		numbers = {}
+		def configuration(key):
+			number = numbers.get(key)
+			if number is None:
+				number = numbers[key] = len(configurations)
+				configurations.append(key)
+			return number
+
+		prefixes = [()]
+		prefix_numbers = {}
+		def prefix(parent, tag):
+			number = prefix_numbers.get((parent, tag))
+			if number is None:
+				number = prefix_numbers[(parent, tag)] = len(prefixes)
+				prefixes.append(prefixes[parent] + tag)
+			return number
+
+		def pending(number, callee, end, back, node):
+			#check if the same call, returning at the same point, was made at the same node
+			while number is not None:
+				symbol, state, origin, stop, p, caller = configurations[number]
+				if origin != node or caller is None:
+					return False
+				if (symbol, stop) == (callee, end) and configurations[caller][:4] == back:
+					return True
+				number = caller
+			return False
+
+		def closure(numbers, node):
+			reached = list(numbers)
+			seen = set(reached)
+			accepting = False
+			for number in reached:
+				symbol, state, origin, end, p, caller = configurations[number]
+				if node == end and state in network[symbol].get_final():
+					if caller is None:
+						accepting = True
+					elif caller not in seen:
+						seen.add(caller)
+						reached.append(caller)
+				items = useful_items(symbol, origin, end)
+				for item, (label, tag, position) in following.get((symbol, state, origin, node), ()):
+					if isinstance(label, _Call) and item in items:
+						back = (symbol, item[1], origin, end)
+						if pending(number, label.symbol, item[3], back, node):
+							continue
+						callee = configuration((label.symbol, network[label.symbol].get_initial(), node, item[3], prefix(p, tag), configuration(back + (p, caller))))
+						if callee not in seen:
+							seen.add(callee)
+							reached.append(callee)
+			return reached, accepting
+
+		root = lattice.root
+		initial = (root, frozenset([configuration((self.start, network[self.start].get_initial(), root, end, 0, None)) for end in ends]))
+		active = {root: [initial]}
+		known = set(active[root])
+		steps = {}
+		live = set()
+		nodes = lattice.nodes()
+		for node in nodes:
+			forest_nodes = active.pop(node, [])
+			if not forest_nodes:
+				continue
+			step = steps[node] = []
+			options = lattice.options(node)
+			for forest_node in forest_nodes:
+				reached, accepting = closure(forest_node[1], node)
+				if accepting and not options:
+					live.add(forest_node)
+				groups = {}
+				keys = []
+				for number in reached:
+					symbol, state, origin, end, p, caller = configurations[number]
+					items = useful_items(symbol, origin, end)
+					for item, (label, tag, position) in following.get((symbol, state, origin, node), ()):
+						if not isinstance(label, _Call) and item in items:
+							tags = prefixes[p] + tag
+							key = (position, label, tags)
+							if key not in groups:
+								groups[key] = []
+								keys.append(key)
+							groups[key].append(configuration((symbol, item[1], origin, end, p, caller)))
+				for key in keys:
+					position, label, tags = key
+					token, successor = options[position]
+					target = (successor, frozenset(groups[key]))
+					if target not in known:
+						known.add(target)
+						active.setdefault(successor, []).append(target)
+					step.append((forest_node, (self.process(label, token), tags), target))
+		forest = ParseForest(initial)
+		for key in live:
+			forest.add_node(key)
+		for node in reversed(nodes):
+			for start, element, end in steps.get(node, ()):
+				if end in live:
+					forest.add_option(start, element, end)
+					live.add(start)
+		return forest
+
+	def match(self, label, token):
+		"""
+		Verify if a label matches a token, calling the C{match} method of the label.
+
+		@return: True if the label matches the token.
+		@rtype: bool
+		"""
+		return label.match(token)
+
+	def process(self, label, token):
+		"""
+		Process a token, returning the tag to append to the parsing result, calling the C{process} method of the label.
+
+		@return: The tag to add to the parsing.
+		@rtype: tag
+		"""
+		return label.process(token)
+
+	def __repr__(self):
+		return "Parse:" + "\n".join(["<%s> %r" % (symbol, fsa) for symbol, fsa in sorted(self.__network.items())])
+
+
+def _canonical(obj, memo):
+	"""
+	Write an object as a string that only depends on its contents, to compute L{content hashes<Grammar.content_hash>}.
+
+	Unlike C{repr} and C{hash}, the string does not depend on the iteration order of sets and dictionaries, nor on the platform:
+	the items of sets and dictionaries are sorted by their own strings, and other objects are written as their class name followed by their pickled state.
+	Sequences, including the alternatives of expressions, are written in their order, which is the order of the parsing results.
+	@note: For internal use only.
+	@param memo: The strings of the objects already written, by identity, so that shared sub-expressions are written once.
+	@type memo: dict
+	@rtype: str
+	"""
+	if obj is None or isinstance(obj, (bool, int, long, float, str, unicode)):
+		return repr(obj)
+	key = id(obj)
+	if key in memo:
+		return memo[key][1]
+	if isinstance(obj, (tuple, list)):
+		r = "(%s)" % ",".join([_canonical(x, memo) for x in obj])
+	elif isinstance(obj, (set, frozenset)):
+		r = "{%s}" % ",".join(sorted([_canonical(x, memo) for x in obj]))
+	elif isinstance(obj, dict):
+		r = "{%s}" % ",".join(sorted(["%s:%s" % (_canonical(k, memo), _canonical(v, memo)) for k, v in obj.iteritems()]))
+	elif hasattr(obj, "__getstate__"):
+		r = "%s%s" % (obj.__class__.__name__, _canonical(obj.__getstate__(), memo))
+	elif hasattr(obj, "__dict__"):
+		r = "%s%s" % (obj.__class__.__name__, _canonical(obj.__dict__, memo))
+	else:
+		r = repr(obj)
+	memo[key] = (obj, r) #the object is kept alive, so that its identity is not reused
+	return r
+
+
+def _private(path):
+	"""
+	Check that a file or directory can only be modified by the current user, so that the L{cached<Grammar.CACHE_DIRECTORY>} parsers can be unpickled.
+	It is always true where user IDs are not available.
+	@note: For internal use only.
+	@rtype: bool
+	@raise OSError: If the path does not exist.
+	"""
+	if not hasattr(os, "getuid"):
+		return True
+	info = os.stat(path)
+	return info.st_uid == os.getuid() and not info.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
 class Grammar(object):
 	"""
 	A container for EBNF rules.
 	"""
+
+	CACHE_DIRECTORY = os.environ.get("PYLILAC_CACHE")
+	"""
+	The directory where compiled grammars are cached, under their L{content hash<content_hash>}, or C{None} to disable the cache.
+	By default, it is taken from the C{PYLILAC_CACHE} environment variable.
+
+	Cached parsers are pickled, and unpickling runs code: the directory must be private to the user.
+	If it is missing, it is created with no permissions for other users;
+	if it belongs to another user or other users can write to it, the cache is not used.
+	@type: str
+	"""
+
+	CACHE_VERSION = 2
+	"""
+	The version of the cached compilings, to increase whenever the compiled parsers change.
+	@type: int
+	"""
+
 	def __init__(self, name):
 		"""
 		Create a Grammar with the given name.
@@ -66,6 +641,75 @@ class Grammar(object):
 		self.__rules = {}
 		self.__compiled = None
 		self.__valid = False
+		self.__dependents = {} #{symbol: set of symbols referencing it}
+		self.__automata = {} #{symbol: FSA, or False if inserted in place}
+		self.__inserted = set()
+		self.__determinize_symbols = True
+		self.__networks = {} #{symbol: FSA with calls}
+		self.__calls = False
+		self.__analysis = None
+
+	def __getstate__(self):
+		"""
+		Return the state to pickle, without the sub-automata of the symbols and the analysis.
+		"""
+		state = self.__dict__.copy()
+		state["_Grammar__automata"] = {}
+		state["_Grammar__inserted"] = set()
+		state["_Grammar__networks"] = {}
+		state["_Grammar__analysis"] = None
+		return state
+
+	def __setstate__(self, state):
+		"""
+		Restore a pickled state, rebuilding the dependencies missing from grammars pickled by earlier versions.
+		"""
+		self.__dict__.update(state)
+		if not hasattr(self, "_Grammar__dependents"):
+			self.__dependents = {}
+			for symbol in self.__rules:
+				self.__link(symbol)
+			self.__automata = {}
+			self.__inserted = set()
+			self.__determinize_symbols = True
+			self.__networks = {}
+			self.__calls = False
+			self.__analysis = None
+
+	def __link(self, symbol):
+		"""
+		Register a symbol among the dependents of the symbols its rule references.
+		"""
+		for dependency in self.__rules[symbol].dependencies():
+			self.__dependents.setdefault(dependency, set()).add(symbol)
+
+	def __touch(self, symbol):
+		"""
+		Invalidate the compiling after a symbol was modified,
+		dropping the sub-automata of the symbol and of all the symbols depending on it.
+		"""
+		self.__valid = False
+		self.__analysis = None
+		self.__networks.pop(symbol, None)
+		stack = [symbol]
+		touched = set(stack)
+		while stack:
+			s = stack.pop()
+			self.__automata.pop(s, None)
+			for dependent in self.__dependents.get(s, ()):
+				if dependent not in touched:
+					touched.add(dependent)
+					stack.append(dependent)
+
+	def dependents(self, symbol):
+		"""
+		Return the symbols whose rules reference a symbol directly.
+
+		@param symbol: The symbol referenced.
+		@type symbol: str
+		@rtype: frozenset of str
+		"""
+		return frozenset(self.__dependents.get(symbol, ()))
 
 	def __setitem__(self, symbol, rhs):
 		"""
@@ -87,6 +731,8 @@ class Grammar(object):
 			self.__symbols.append(symbol)
 		if self.start is None:
 			self.start = symbol
+		self.__link(symbol)
+		self.__touch(symbol)
 
 	def __getitem__(self, symbol):
 		"""
@@ -106,6 +752,8 @@ class Grammar(object):
 		@param symbol: The symbol to clear.
 		@type symbol: str
 		"""
+		for dependency in self.__rules[symbol].dependencies():
+			self.__dependents[dependency].discard(symbol)
 		del self.__rules[symbol]
 		self.__symbols.remove(symbol)
 		if self.start == symbol:
@@ -113,6 +761,7 @@ class Grammar(object):
 				self.start = None
 			else:
 				self.start = self.__symbols[0]
+		self.__touch(symbol)
 
 	def __contains__(self, symbol):
 		"""
@@ -155,6 +804,77 @@ class Grammar(object):
 
 
 
+	def analyze(self):
+		"""
+		Analyze the structure of the grammar, without raising errors for its anomalies.
+
+		The symbols reachable from the start symbol are visited once, by Tarjan's algorithm for strongly connected components:
+		the components are found with the symbols they reference before them, so that the depths are computed in the same pass.
+		The report is kept until the rules or the start symbol are modified.
+
+		@rtype: L{GrammarAnalysis}
+		"""
+		if self.__analysis is not None and self.__analysis.start == self.start:
+			return self.__analysis
+		order = []
+		depths = {}
+		undefined = set()
+		cycles = []
+		dependencies = {}
+		if self.start is not None:
+			if self.start not in self.__rules:
+				undefined.add(self.start)
+			else:
+				def dependencies_of(symbol):
+					d = dependencies.get(symbol)
+					if d is None:
+						d = dependencies[symbol] = tuple(sorted(self.__rules[symbol].dependencies()))
+					return d
+				number = {self.start: 0}
+				low = {self.start: 0}
+				stack = [self.start]
+				on_stack = set(stack)
+				work = [(self.start, iter(dependencies_of(self.start)))]
+				while work:
+					symbol, deps = work[-1]
+					for dep in deps:
+						if dep not in self.__rules:
+							undefined.add(dep)
+						elif dep not in number:
+							number[dep] = low[dep] = len(number)
+							stack.append(dep)
+							on_stack.add(dep)
+							work.append((dep, iter(dependencies_of(dep))))
+							break
+						elif dep in on_stack:
+							low[symbol] = min(low[symbol], number[dep])
+					else:
+						work.pop()
+						if work:
+							caller = work[-1][0]
+							low[caller] = min(low[caller], low[symbol])
+						if low[symbol] == number[symbol]:
+							component = []
+							while True:
+								s = stack.pop()
+								on_stack.remove(s)
+								component.append(s)
+								if s == symbol:
+									break
+							component.reverse()
+							members = set(component)
+							if len(component) > 1 or symbol in dependencies_of(symbol):
+								cycles.append(tuple(component))
+							for s in component:
+								depth = 0
+								for dep in dependencies_of(s):
+									if dep not in members:
+										depth = max(depth, depths.get(dep, 0) + 1)
+								depths[s] = depth
+							order.extend(component)
+		self.__analysis = GrammarAnalysis(self.start, order, depths, undefined, cycles, dependencies)
+		return self.__analysis
+
 	def browse(self):
 		"""
 		Check the grammar for anomalies.
@@ -164,54 +884,98 @@ class Grammar(object):
 			- Unresolved references
 			- Cyclic references
 
-		@returns: The maximum depth with no recursion
-		@rtype: int
+		@returns: The L{analysis<analyze>} of the grammar; its L{depth<GrammarAnalysis.depth>} is the maximum depth with no recursion.
+		@rtype: L{GrammarAnalysis}
 		@raise GrammarError: If anomalies are encountered while browsing.
 
 		"""
-		def descend(symbol, ancestors = ()):
-			if symbol not in self.__rules:
-				raise UndefinedSymbolError(symbol)
-			rhs = self.__rules[symbol]
-			max_depth = 0
-			for dep in rhs.dependencies():
-				d = 0
-				if dep in ancestors:
-					raise CyclicReferenceError(symbol, dep)
-				else:
-					d = descend(dep, ancestors + (symbol,)) + 1
-				if d > max_depth:
-					max_depth = d
-			return max_depth
-
-		if self.start is None:
-			raise GrammarError("No start symbol defined")
-		return descend(self.start)
+		analysis = self.analyze()
+		analysis.check()
+		return analysis
 
-	def compile(self, force = False):
+	def compile(self, force = False, lazy = False, recursive = False):
 		"""
 		Compile the set of rules into a Deterministic State Automaton (DFSA).
 
 		If the grammar has never been compiled or it has been modified after last compilation, it will be translated into an FSA.
 		The result will be kept available until the rules are modified or the grammar reset.
 
-		The algorithm calls recursively the L{bnf.NormalExpression.insert_transitions} method.
+		The algorithm calls recursively the L{bnf.NormalExpression.insert_transitions} method;
+		symbols referenced more than once can be compiled once and L{inserted<insert_symbol>} as copies of their sub-automata.
 
 		If the C{force} flag is off and the grammar was already compiled and was not updated, the old result is taken with no recompiling.
+		Otherwise, the sub-automata of the symbols are kept among compilings:
+		modifying a rule only drops the sub-automata of its symbol and of the symbols depending on it, directly or not.
+		If the C{force} flag is on, all the sub-automata are rebuilt.
+
+		Only recursive compilings are incremental, i.e. they cost as much as the rules modified:
+		a flat compiling builds, reduces and minimizes the whole automaton again after any modification,
+		reusing only the sub-automata of the symbols that are shared, which are mostly leaves;
+		its cost is about the same as a full compiling.
+		Grammars edited often, as in an editor, should be compiled with the C{recursive} flag on, as L{lects<lect.Lect.compile>} do.
+
+		If the C{lazy} flag is on, the FSA is not reduced nor minimized: the parser runs on a L{lazy<fsa.LazyDFA>} FSA,
+		whose states are determinized when parsing first reaches them.
+		The time to the first parsing depends then on the input rather than on the size of the grammar.
+
+		If the C{recursive} flag is on, the grammar is compiled as a I{recursive transition network}:
+		each symbol is compiled into its own FSA, where the references to other symbols are calls, and the parser keeps a stack of return points.
+		Grammars with cyclic references can be compiled and the size of the result is proportional to the size of the rules;
+		modifying a rule only recompiles the FSA of its symbol, while the FSAs of the other symbols are reused as they are.
+
+		The C{lazy} and C{recursive} flags are taken into account only when compiling takes place.
+
+		If a L{cache directory<CACHE_DIRECTORY>} is set, the parsers compiled in eager or recursive mode are stored there under the L{content hash<content_hash>} of the grammar:
+		if a grammar with the same rules was already compiled, by any process sharing the directory, its parser is loaded instead of compiling.
+		If the C{force} flag is on, the cache is not read, but it is updated.
 
 		@see: L{Finite State Automaton<fsa.FSA>}
 		@param force: Recompile grammar even if it has already been validated and compiled.
 		@type force: bool
+		@param lazy: Determinize the FSA while parsing.
+		@type lazy: bool
+		@param recursive: Compile a recursive transition network.
+		@type recursive: bool
 		@raise GrammarError: If anomalies are encountered while precompiling.
 		@return: A parser for the grammar.
-		@rtype: fsa.Parser
+		@rtype: fsa.Parser, or a parser with the same C{__call__} and C{parse_forest} methods for recursive compilings
 
 		"""
 
-		if force or not self.__valid and self.__compiled is None:
+		if force:
+			self.__automata = {}
+			self.__networks = {}
+		elif (not self.__valid or self.__compiled is None) and not lazy:
+			cached = self.__load_cached(recursive)
+			if cached is not None:
+				self.__compiled = cached
+				self.__valid = True
+		if (force or not self.__valid or self.__compiled is None) and recursive:
+			self.__valid = False
+			analysis = self.analyze()
+			if self.start is None:
+				raise GrammarError("No start symbol defined")
+			if analysis.undefined:
+				raise UndefinedSymbolError(sorted(analysis.undefined)[0])
+			self.__calls = True
+			try:
+				network = {}
+				for symbol in analysis.order:
+					fsa = self.__networks.get(symbol)
+					if fsa is None:
+						fsa = self.__networks[symbol] = self.__rule_automaton(symbol).reduced().minimized().freeze()
+					network[symbol] = fsa
+			finally:
+				self.__calls = False
+			self.__compiled = _NetworkParser(self.start, network)
+			self.__valid = True
+			self.__store_cached(recursive)
+		elif force or not self.__valid or self.__compiled is None:
 			self.__valid = False
 
 			self.browse()
+			self.__inserted = set()
+			self.__determinize_symbols = not lazy
 			nfa = FSA()
 			initial = nfa.add_state()
 			nfa.set_initial(initial)
@@ -220,14 +984,158 @@ class Grammar(object):
 
 			s = self.__rules[self.start]
 			s.insert_transitions(self, nfa, initial, final, ())
-			#rewriting to save memory
-			nfa = nfa.reduced()
-			nfa = nfa.minimized()
-			self.__compiled = _GrammarParser(nfa)
+			self.__inserted = set()
+			if lazy:
+				self.__compiled = _GrammarParser(LazyDFA(nfa))
+			else:
+				#rewriting to save memory
+				nfa = nfa.reduced()
+				nfa = nfa.minimized()
+				self.__compiled = _GrammarParser(nfa)
 			self.__valid = True
+			if not lazy:
+				self.__store_cached(recursive)
 		return self.__compiled
 
 
+	def insert_symbol(self, symbol, fsa, initial, final, tag):
+		"""
+		Insert the sub-FSA of a symbol in an FSA, during L{compiling<compile>}.
+
+		The first reference to a symbol inserts its rule in place.
+		At the second reference, the rule is compiled once into a reduced and minimized sub-FSA with no tag prefix:
+		if it has fewer transitions than the rule inserted in place, even counting the S{epsilon}-transitions of the splice, it is kept until the end of the compiling
+		and L{spliced<fsa.FSA.splice>} at each further reference, prefixing its tags with the tag of the reference.
+		The sub-FSA is kept by the following compilings too, until the rule of the symbol or of one of its dependencies is modified.
+		Symbols whose rules do not shrink, typically because removing the S{epsilon}-transitions of closures multiplies the transitions,
+		and all the symbols of lazy compilings keep being inserted in place.
+		In recursive compilings, a L{call<_Call>} transition is inserted instead.
+
+		@param symbol: The symbol to insert.
+		@type symbol: str
+		@param fsa: The Finite-state Automaton in which the sub-FSA must be inserted.
+		@type fsa: FSA
+		@param initial: The state from which the sub-FSA departs.
+		@type initial: FSA node
+		@param final: The state in which the sub-FSA ends.
+		@type final: FSA node
+		@param tag: The tag prefix for the arcs.
+		@type tag: tuple
+		@raise UndefinedSymbolError: If the symbol is not defined.
+		"""
+		if symbol not in self.__rules:
+			raise UndefinedSymbolError(symbol)
+		if self.__calls:
+			fsa.add_transition(initial, _Call(symbol), final, tag)
+			return
+		rhs = self.__rules[symbol]
+		if self.__determinize_symbols:
+			sub = self.__automata.get(symbol)
+			if sub is None and symbol in self.__inserted:
+				sub = self.__rule_automaton(symbol)
+				size = len(list(sub.iter_transitions()))
+				sub = sub.reduced().minimized()
+				if len(list(sub.iter_transitions())) + 1 + len(sub.get_final()) < size:
+					self.__automata[symbol] = sub
+				else:
+					self.__automata[symbol] = sub = False
+			if isinstance(sub, FSA):
+				fsa.splice(sub, initial, final, lambda t: tag + t)
+				return
+			self.__inserted.add(symbol)
+		rhs.insert_transitions(self, fsa, initial, final, tag)
+
+	def __rule_automaton(self, symbol):
+		"""
+		Build an FSA for the rule of a symbol, with no tag prefix.
+		"""
+		fsa = FSA()
+		initial = fsa.add_state()
+		fsa.set_initial(initial)
+		final = fsa.add_state()
+		fsa.set_final(final)
+		self.__rules[symbol].insert_transitions(self, fsa, initial, final, ())
+		return fsa
+
+	def content_hash(self):
+		"""
+		Compute a hash of the start symbol and the rules of the grammar.
+
+		The hash is deterministic: grammars with the same rules have the same hash in any process and on any platform,
+		no matter the order in which the rules were added. The name of the grammar is not taken into account.
+		The order of the alternatives of each rule is taken into account, since it is the order of the parsing results.
+
+		@return: The hexadecimal SHA-1 digest of the grammar.
+		@rtype: str
+		"""
+		memo = {}
+		rules = [(symbol, _canonical(self.__rules[symbol], memo)) for symbol in sorted(self.__rules)]
+		return hashlib.sha1(_canonical((self.start, rules), {})).hexdigest()
+
+	def __cache_file(self, recursive):
+		"""
+		Return the name of the cache file for the current rules, or C{None} if the cache is disabled or its directory is not L{private<_private>}.
+		The directory is created if it is missing.
+		"""
+		if self.CACHE_DIRECTORY is None:
+			return None
+		try:
+			if not os.path.isdir(self.CACHE_DIRECTORY):
+				os.makedirs(self.CACHE_DIRECTORY, 0700)
+			if not _private(self.CACHE_DIRECTORY):
+				return None
+		except OSError:
+			return None
+		if recursive:
+			mode = "rtn"
+		else:
+			mode = "dfa"
+		return os.path.join(self.CACHE_DIRECTORY, "%s-%d-%s.parser" % (self.content_hash(), self.CACHE_VERSION, mode))
+
+	def __load_cached(self, recursive):
+		"""
+		Load the cached parser for the current rules.
+
+		@return: The parser, or C{None} if it is not cached, can not be read or is not L{private<_private>}.
+		"""
+		filename = self.__cache_file(recursive)
+		if filename is None or not os.path.exists(filename):
+			return None
+		try:
+			if not _private(filename):
+				return None
+			f = open(filename, "rb")
+			try:
+				return pickle.load(f)
+			finally:
+				f.close()
+		except Exception: #unreadable or stale entries are compiled again and overwritten
+			return None
+
+	def __store_cached(self, recursive):
+		"""
+		Store the compiled parser in the cache.
+		The file is written under a temporary name and then renamed, so that other processes never read a partial entry.
+		A parser that can not be stored is simply compiled again the next time.
+		"""
+		filename = self.__cache_file(recursive)
+		if filename is None:
+			return
+		try:
+			handle, temporary = tempfile.mkstemp(".tmp", "", self.CACHE_DIRECTORY)
+			try:
+				f = os.fdopen(handle, "wb")
+				try:
+					pickle.dump(self.__compiled, f, -1)
+				finally:
+					f.close()
+				os.rename(temporary, filename)
+			except:
+				os.remove(temporary)
+				raise
+		except (IOError, OSError, pickle.PicklingError, TypeError): #the cache is an optimization: an unwritable directory or an unpicklable label does not prevent compiling
+			pass
+
 	def reset(self):
 		"""
 		Delete the internal result of the last compiling.
@@ -235,3 +1143,5 @@ class Grammar(object):
 		del self.__compiled
 		self.__compiled = None
 		self.__valid = False
+		self.__automata = {}
+		self.__networks = {}
@@ -311,6 +311,16 @@ class Word(object):
 			lemma = self.__lemma
 		return Word(self.__form, lemma, self.categories[:])
 
+	def dispatch_keys(self):
+		"""
+		Return the keys used by parsers to select the L{filters<WordFilter>} that might match the word.
+
+		@see: L{WordFilter.dispatch_key}
+		@return: The form, the lemma key and the part of speech, each preceded by its field name.
+		@rtype: tuple of tuple
+		"""
+		return (("form", self.__form), ("lemma", self.__lemma.key()), ("p_o_s", self.__lemma.p_o_s))
+
 	def __nonzero__(self):
 		"""
 		Check if the word is defective.
@@ -331,26 +341,41 @@ class Lexicon(object):
 		self.__lemmas = {}
 		self.__words = {}
 		self.__compiled = None
+		self.__compiled_properties = None
 		self.__indexed_words = {}
-		self.__valid = False
+
+	def __setstate__(self, state):
+		"""
+		Restore a pickled state, dropping the tokenizer of lexica pickled by earlier versions,
+		which did not record the properties it was compiled with.
+		"""
+		state.pop("_Lexicon__valid", None)
+		if "_Lexicon__compiled_properties" not in state:
+			state["_Lexicon__compiled"] = None
+			state["_Lexicon__compiled_properties"] = None
+		self.__dict__.update(state)
 
 	def compile(self, properties, force = False):
 		"""
 		Compile the words of the lexicon into a L{tokenizer<tokenizer.Tokenizer>}.
 		The tokenizer is a tool for making expression parsing quick.
-		If the C{force} flag is off and the lexicon was already compiled and was not updated, the old result is taken with no recompiling.
+		If the C{force} flag is off and the lexicon was already compiled with the same properties, the old result is taken with no recompiling:
+		the words added and removed after compiling are L{added<tokenizer.Tokenizer.add>} to and L{removed<tokenizer.Tokenizer.remove>} from the tokenizer as they change,
+		so that it is always up to date.
 
 		@see: L{Finite State Automaton<fsa.FSA>}
+		@param properties: The options of the tokenizer.
+		@type properties: dict
 		@param force: Recompile lexicon even if it has already been validated and compiled.
 		@type force: bool
 		@rtype: tokenizer.Tokenizer
 		@raise tokenizer.UnknownTokenException: If an unknown characters is encountered while precompiling..
 		@raise fsa.ParseError: If unexpected characters or stops are encountered.
 		"""
-		if force or not self.__valid and self.__compiled is None:
-			self.__valid = False
+		if force or self.__compiled is None or self.__compiled_properties != properties:
+			self.__compiled = None
 			self.__compiled = Tokenizer(self.__words, properties)
-			self.__valid = True
+			self.__compiled_properties = dict(properties)
 		return self.__compiled
 
 	def reset(self):
@@ -359,7 +384,7 @@ class Lexicon(object):
 		"""
 		del self.__compiled
 		self.__compiled = None
-		self.__valid = False
+		self.__compiled_properties = None
 
 	#{Methods for manipulating words
 	def add_word(self, word):
@@ -388,7 +413,8 @@ class Lexicon(object):
 			word = word.copy(self.add_lemma(lemma))
 		self.__words.setdefault(word.form, []).append(word)
 		self.__indexed_words.setdefault(word.lemma.key(), []).append(word)
-		self.__valid = False
+		if self.__compiled is not None:
+			self.__compiled.add(word.form, word)
 		return word
 
 	def remove_word(self, word):
@@ -402,7 +428,8 @@ class Lexicon(object):
 			raise TypeError(word)
 		self.__indexed_words[word.lemma.key()].remove(word)
 		self.__words[word.form].remove(word)
-		self.__valid = False
+		if self.__compiled is not None:
+			self.__compiled.remove(word.form, word)
 
 	def find_words(self, form = None, lemma_key = None, categories = None):
 		"""
@@ -453,7 +480,6 @@ class Lexicon(object):
 			raise ExistingLemmaError(self.__lemmas[k])
 		else:
 			self.__lemmas[k] = lemma
-		self.__valid = False
 		return lemma
 
 	def remove_lemma_by_key(self, lemma_key):
@@ -466,9 +492,10 @@ class Lexicon(object):
 		"""
 		for w in self.__indexed_words[lemma_key]:
 			self.__words[w.form].remove(w)
+			if self.__compiled is not None:
+				self.__compiled.remove(w.form, w)
 		del self.__indexed_words[lemma_key]
 		del self.__lemmas[lemma_key]
-		self.__valid = False
 
 	def get_lemma_by_key(self, lemma_key):
 		"""
@@ -553,7 +580,6 @@ class Lexicon(object):
 				p_o_s = w.lemma.p_o_s
 				if p_o_s in d:
 					check_length(w, len(d[p_o_s][1]), err, corrective_p_o_s)
-		self.__valid = False
 		return err
 
 class WordFilter(Literal):
@@ -573,9 +599,13 @@ class WordFilter(Literal):
 		@param word: The word containing the conditions to include.
 		@type word: Word
 		"""
+		Literal.__init__(self, self._key(word))
+
+	def _key(cls, word):
 		if not isinstance(word, Word):
 			raise TypeError(word)
-		Literal.__init__(self, (word.form, word.lemma.entry_form, word.lemma.id, None, None, word.categories))
+		return (word.form, word.lemma.entry_form, word.lemma.id, None, None, word.categories)
+	_key = classmethod(_key)
 
 	def form(self):
 		return self._content[0]
@@ -590,7 +620,7 @@ class WordFilter(Literal):
 	def categories(self):
 		return self._content[5]
 
-	def __hash__(self):
+	def _compute_hash(self):
 		def dict_hash(x, i):
 			if x is None:
 				return 0
@@ -626,6 +656,23 @@ class WordFilter(Literal):
 			return False
 		return True
 
+	def dispatch_key(self):
+		"""
+		Return the most selective field among form, lemma key and part of speech, as one of the L{dispatch keys<Word.dispatch_keys>} of the matching words.
+
+		@rtype: tuple
+		@return: The field name followed by its value, or C{None} if none of the fields is regarded.
+		"""
+		form, entry_form, id, p_o_s = self._content[0:4]
+		if form is not None:
+			return ("form", form)
+		elif entry_form is not None and id is not None:
+			return ("lemma", (entry_form, id))
+		elif p_o_s is not None:
+			return ("p_o_s", p_o_s)
+		else:
+			return None
+
 	def process(self, word):
 		"""
 		Process the word and return it for tagging.
@@ -693,11 +740,15 @@ class WordCategoryFilter(WordFilter):
 		@param categories: The word category to match.
 		@type categories: tuple of str/CategoryFilter
 		"""
+		Literal.__init__(self, self._key(p_o_s, lemma_categories, categories))
+
+	def _key(cls, p_o_s = None, lemma_categories = None, categories = None):
 		if lemma_categories is not None and not isinstance(lemma_categories, tuple):
 			raise TypeError(lemma_categories)
 		if categories is not None and not isinstance(categories, tuple):
 			raise TypeError(categories)
-		Literal.__init__(self, (None, None, None, p_o_s, lemma_categories, categories))
+		return (None, None, None, p_o_s, lemma_categories, categories)
+	_key = classmethod(_key)
 
 	def __repr__(self):
 		"""
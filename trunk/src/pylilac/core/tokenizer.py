@@ -11,10 +11,8 @@ A specialized parser for expressions.
 
 __docformat__ = "epytext en"
 
-from fsa import FSA
-from fsa import ParseError
-from fsa import Parser
-from optiontree import OptionTree
+from forest import ParseForest
+from trie import DoubleArrayTrie, Trie
 
 class UnknownTokenException(KeyError):
 	"""
@@ -22,91 +20,202 @@ class UnknownTokenException(KeyError):
 	"""
 	pass
 
-class Tokenizer(Parser):
+class Tokenizer(object):
 	"""
 	A parser specialized for tokenizing strings.
+
+	The keys of the map are stored in a L{double-array trie<trie.DoubleArrayTrie>}:
+	from every position reached in the string, the trie yields the indices of the keys starting there and followed by the separator,
+	and each position is explored once.
+	The recognitions are kept in a table by those indices, so the keys are stored only by the trie.
+
+	The tokenizer can be updated one recognition at a time, with L{add} and L{remove}.
+	Since the double array is read-only, the keys added later are kept in a mutable L{trie<trie.Trie>}, with their recognitions,
+	and the keys removed are left with no recognitions in the table, until a new tokenizer is created.
+
+	The tokenizer has the L{__call__} and L{parse_forest} methods of a L{parser<fsa.Parser>}, but it is no longer one, since it has no FSA:
+	it has no L{get_fsa<fsa.Parser.get_fsa>} method and no incremental L{sessions<fsa.Parser.start>},
+	and its trie is saved by pickling the result of L{get_trie}, rather than in the L{binary format<fsa.CompactFSA.dump>} of frozen FSAs.
 	"""
-	def __init__(self, map, options):
+	def __init__(self, map, options, trie = None):
 		"""
 		Create a Tokenizer from a map.
+		The map is copied, so that later changes to it do not affect the tokenizer.
 		@param map: A map associating tokens to their possible recognitions.
 		@type map: dict (unicode -> list of object)
 		@param options: The options to use.
 			Required information is:
 				- A separator
 		@type options: dict
+		@param trie: The trie of the map keys, as returned by L{get_trie}, typically unpickled from a file;
+			if C{None}, it is created from the map.
+		@type trie: DoubleArrayTrie
 		"""
 		self._separator = options["separator"]
-		fsa = self.__create_key_fsa(map)
-		Parser.__init__(self, fsa)
-		self.__dict = map
-
-	def process(self, label, token):
-		"""
-		Override the generic behavior of a Parser.
-		No processing required for tokenizing.
-		@return: C{None}
-		"""
-		return None
-
-	def __create_key_fsa(self, dict):
-		"""
-		Create an FSA from the keys in a map.
-		"""
-		def add_key(fsa, key):
-			def add_new_transition(fsa, start, label, end, tag):
-				for x in fsa.transitions_from(start):
-					if x == (label, end, tag):
-						return False
-				fsa.add_transition(start, label, end, tag)
-
-			for j in range(len(key), -1, -1):
-				if j > 0 and fsa.has_state(key[:j]):
-					break
-			s = key + self._separator
-			for i in range(j, len(s)):
-				c = s[i]
-				if i == len(s) - 1: #last step
-					end = fsa.get_initial()
-					tag = key
-				else:
-					end = s[:i + 1]
-					tag = None
-				add_new_transition(fsa, s[:i], c, end, tag)
-		fsa = FSA()
-		fsa.add_state("")
-		fsa.set_initial("")
-		fsa.set_final("")
-		for k, v in dict.items():
+		if trie is None:
+			trie = DoubleArrayTrie([key for key, v in map.iteritems() if v])
+		self.__trie = trie
+		self.__fill(map)
+
+	def __setstate__(self, state):
+		"""
+		Restore a pickled state, moving the map of tokenizers pickled by earlier versions into the table,
+		and building the trie missing from those which parsed a character FSA.
+		"""
+		self.__dict__.update(state)
+		if "_Tokenizer__readings" not in state:
+			map = self.__dict__.pop("_Tokenizer__dict")
+			self.__dict__.pop("_Tokenizer__removed", None)
+			if "_Tokenizer__trie" not in state:
+				self.__trie = DoubleArrayTrie([key for key, v in map.iteritems() if v])
+				self.__dict__.pop("_Parser__fsa", None)
+			self.__fill(map)
+
+	def get_trie(self):
+		"""
+		Return the trie of the map keys, as they were when the tokenizer was created.
+		@rtype: DoubleArrayTrie
+		"""
+		return self.__trie
+
+	def __fill(self, map):
+		"""
+		Copy the recognitions of a map into the table, by the indices of their keys in the trie,
+		and those of the keys missing from the trie among the added keys.
+		"""
+		for v in map.itervalues():
 			if not isinstance(v, list):
 				raise TypeError(v)
-			add_key(fsa, k)
-		return fsa
+		self.__readings = [None] * len(self.__trie)
+		self.__extra = {}
+		self.__added = Trie()
+		for key, v in map.iteritems():
+			if v:
+				index = self.__trie.index(key)
+				if index is None:
+					self.__extra[key] = list(v)
+					self.__added.add(key)
+				else:
+					self.__readings[index] = list(v)
 
-	def __call__(self, stream):
+	def add(self, key, obj):
 		"""
-		Tokenize a character stream.
-		@param stream: A character stream.
-		@param stream: unicode
-		@return: The result of the parsing.
-		@rtype: OptionTree
+		Add a possible recognition of a token.
+		The cost depends on the length of the token, not on the size of the map.
 
-		@raise tokenizer.UnknownTokenException: If an unexpected token is encountered.
+		@param key: The token.
+		@type key: unicode
+		@param obj: The recognition.
+		@type obj: object
 		"""
-		def explode_list(dct, lst, pos):
-			t = OptionTree()
-			if pos < len(lst):
-				for obj in dct[lst[pos]]:
-					c = explode_list(dct, lst, pos + 1)
-					c.element = obj
-					t.append(c)
-			return t
+		index = self.__trie.index(key)
+		if index is None:
+			readings = self.__extra.get(key)
+			if readings is None:
+				readings = self.__extra[key] = []
+				self.__added.add(key)
+		else:
+			readings = self.__readings[index]
+			if readings is None:
+				readings = self.__readings[index] = []
+		readings.append(obj)
 
-		terminated = stream + self._separator
-		try:
-			p = Parser.__call__(self, terminated)
-		except ParseError, pe:
-			dead_end = len(pe) - 1
+	def remove(self, key, obj):
+		"""
+		Remove a possible recognition of a token.
+		The cost depends on the length of the token, not on the size of the map.
+
+		@param key: The token.
+		@type key: unicode
+		@param obj: The recognition.
+		@type obj: object
+		@raise ValueError: If the recognition is not associated to the token.
+		"""
+		index = self.__trie.index(key)
+		if index is None:
+			readings = self.__extra.get(key, [])
+		else:
+			readings = self.__readings[index] or []
+		readings.remove(obj)
+		if not readings:
+			if index is None:
+				del self.__extra[key]
+				self.__added.discard(key)
+			else:
+				self.__readings[index] = None
+
+	def __prefixes(self, terminated, position):
+		"""
+		Find the keys of the map that are prefixes of a string from a position, in the double array and among the keys added later.
+
+		@return: The C{(end, recognitions)} pairs of the keys having some recognitions, by increasing length,
+			and the position of the first character that could not be followed in the tries.
+		@rtype: tuple (list of tuple, int)
+		"""
+		table = self.__readings
+		matches, stop = self.__trie.prefixes(terminated, position)
+		matches = [(end, table[index]) for end, index in matches if table[index]]
+		if self.__added:
+			added, added_stop = self.__added.prefixes(terminated, position)
+			if added:
+				matches.extend([(end, self.__extra[key]) for end, key in added])
+				matches.sort(key = lambda match: match[0])
+			stop = max(stop, added_stop)
+		return matches, stop
+
+	def __tokens(self, terminated):
+		"""
+		Find the keys followed by the separator from each position reachable from the start of a string.
+
+		@return: The C{(recognitions, next position)} pairs departing from each reachable position,
+			and the position of the furthest character that could not be tokenized.
+		@rtype: tuple (dict, int)
+		"""
+		separator = self._separator
+		following = {}
+		dead_end = -1
+		stack = [0]
+		while stack:
+			position = stack.pop()
+			if position in following:
+				continue
+			if position == len(terminated):
+				following[position] = []
+				continue
+			matches, stop = self.__prefixes(terminated, position)
+			dead_end = max(dead_end, min(stop, len(terminated) - 1))
+			tokens = []
+			for end, readings in matches:
+				if terminated.startswith(separator, end):
+					if end + len(separator) > position:
+						tokens.append((readings, end + len(separator)))
+				else:
+					k = 0
+					while end + k < len(terminated) and terminated[end + k] == separator[k]:
+						k += 1
+					dead_end = max(dead_end, min(end + k, len(terminated) - 1))
+			following[position] = tokens
+			stack.extend([next for readings, next in tokens])
+		return following, dead_end
+
+	def __segments(self, stream, terminated):
+		"""
+		Find the tokens on the paths from the start to the end of a string.
+
+		@return: The C{(recognitions, next position)} pairs departing from each position that leads to the end of the string.
+		@rtype: dict
+		@raise tokenizer.UnknownTokenException: If the end of the string cannot be reached.
+		"""
+		following, dead_end = self.__tokens(terminated)
+		viable = {}
+		for position in sorted(following, reverse = True):
+			if position == len(terminated):
+				viable[position] = []
+			else:
+				tokens = [(readings, next) for readings, next in following[position] if next in viable]
+				if tokens:
+					viable[position] = tokens
+		if 0 not in viable:
 			rgt = max(stream.rfind(self._separator, 0, dead_end-1) + 1, 0)
 			lft = stream.find(self._separator, dead_end + 1)
 			if lft <> -1:
@@ -114,7 +223,57 @@ class Tokenizer(Parser):
 			else:
 				ell = u""
 			raise UnknownTokenException(stream[rgt:lft] + ell)
-		ot = OptionTree()
-		for u in p.expand():
-			ot.append(explode_list(self.__dict, [y[1] for y in u if y[1] is not None], 0))
-		return ot
+		return viable
+
+	def lattice(self, stream):
+		"""
+		Tokenize a character stream into a word lattice.
+
+		The nodes of the lattice are the character offsets where the tokens begin, plus the length of the stream, where the sequences end;
+		every recognition of a token is an option from the offset where the token begins to the one where the next token begins.
+		The lattice is built in one pass over the positions, so each ambiguous token adds options rather than multiplying sequences.
+
+		@param stream: A character stream.
+		@type stream: unicode
+		@return: The lattice of the possible recognitions, rooted at offset 0.
+		@rtype: forest.ParseForest
+
+		@raise tokenizer.UnknownTokenException: If an unexpected token is encountered.
+		"""
+		terminated = stream + self._separator
+		segments = self.__segments(stream, terminated)
+		lattice = ParseForest(0)
+		lattice.add_node(lattice.root)
+		for position in sorted(segments):
+			for readings, next in segments[position]:
+				for obj in readings:
+					lattice.add_option(position, obj, min(next, len(stream)))
+		return lattice
+
+	def parse_forest(self, stream):
+		"""
+		Tokenize a character stream into a shared forest, as L{Parser.parse_forest<fsa.Parser.parse_forest>} does.
+		The forest is the L{lattice}.
+
+		@param stream: A character stream.
+		@type stream: unicode
+		@rtype: forest.ParseForest
+
+		@raise tokenizer.UnknownTokenException: If an unexpected token is encountered.
+		"""
+		return self.lattice(stream)
+
+	def __call__(self, stream):
+		"""
+		Tokenize a character stream.
+		Sequences sharing their ending share the same option trees, as in the L{lattice}.
+		Like L{Parser.__call__<fsa.Parser.__call__>}, it converts the L{parse_forest} into an option tree.
+
+		@param stream: A character stream.
+		@param stream: unicode
+		@return: The result of the parsing.
+		@rtype: OptionTree
+
+		@raise tokenizer.UnknownTokenException: If an unexpected token is encountered.
+		"""
+		return self.parse_forest(stream).to_option_tree()
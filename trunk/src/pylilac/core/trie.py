@@ -0,0 +1,399 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+A module for the DoubleArrayTrie and Trie utility classes.
+
+@author: Paolo Olmino
+@license: U{GNU GPL GNU General Public License<http://www.gnu.org/licenses/gpl.html>}
+@version: Alpha 0.1.6
+"""
+
+__docformat__ = "epytext en"
+
+from array import array
+
+
+class DoubleArrayTrie(object):
+	"""
+	A compact, read-only trie of strings, stored in a I{double array}.
+
+	The trie is minimized into a I{directed acyclic word graph} (DAWG), where the keys sharing a suffix, such as inflected forms sharing an ending, share its states.
+	Characters are numbered by an alphabet, and every transition is a slot in parallel arrays:
+	the transition from state M{s} with character code M{c} is slot M{t = base[s] + c}, provided that M{check[t] = s}, and it leads to state M{target[t]}.
+	A step is then a few array lookups, and the whole trie takes a few integers per transition,
+	rather than a dictionary of transitions per state.
+
+	Since a state of the DAWG can end many keys, keys are found by I{perfect hashing}:
+	each transition is numbered with the count of keys it skips, and the sum along the path to a final state is the index of the key in the sorted keys.
+	The keys themselves are not stored: L{prefixes} and L{index} return these indices, so that the values of the keys can be kept in a table by their users,
+	and L{keys} spells them again from the double array.
+	"""
+	ROOT = 0
+	"""
+	The initial state.
+	@type: int
+	"""
+
+	def __init__(self, keys):
+		"""
+		Build the trie of a set of keys.
+
+		@param keys: The keys to store.
+		@type keys: iterable of unicode
+		"""
+		keys = sorted(set(keys))
+		self.__count = len(keys)
+		chars = set()
+		for key in keys:
+			chars.update(key)
+		self.__alphabet = dict([(c, code + 1) for code, c in enumerate(sorted(chars))])
+		self.__build(keys)
+
+	def __setstate__(self, state):
+		"""
+		Restore a pickled state, dropping the keys that tries pickled by earlier versions stored.
+		"""
+		keys = state.pop("_DoubleArrayTrie__keys", None)
+		if keys is not None:
+			state["_DoubleArrayTrie__count"] = len(keys)
+		self.__dict__.update(state)
+
+	def __minimal_dawg(self, keys):
+		"""
+		Build the minimal DAWG of some sorted keys incrementally, as described by Daciuk et al.:
+		when a key is added, the states of the previous key beyond their common prefix are complete,
+		and each of them is replaced by an equivalent state already registered, if any.
+
+		@return: The transitions of the states, as C{{code: state}} dictionaries, and the final states, both indexed by state;
+			the states that were replaced are left unreachable.
+		@rtype: tuple (list of dict, list of bool)
+		"""
+		alphabet = self.__alphabet
+		children = [{}]
+		final = [False]
+		register = {}
+
+		def minimize(path, length):
+			for i in xrange(len(path) - 1, length, -1):
+				state = path[i]
+				signature = (final[state], tuple(sorted(children[state].iteritems())))
+				equivalent = register.setdefault(signature, state)
+				if equivalent != state:
+					parent = path[i - 1]
+					children[parent][max(children[parent])] = equivalent
+
+		path = [0]
+		previous = u""
+		for key in keys:
+			common = 0
+			for a, b in zip(previous, key):
+				if a != b:
+					break
+				common += 1
+			minimize(path, common)
+			del path[common + 1:]
+			for c in key[common:]:
+				state = len(children)
+				children.append({})
+				final.append(False)
+				children[path[-1]][alphabet[c]] = state
+				path.append(state)
+			final[path[-1]] = True
+			previous = key
+		minimize(path, 0)
+		return children, final
+
+	def __build(self, keys):
+		"""
+		Build the minimal DAWG of some sorted keys, then place its states in the double array, in depth-first post-order, children before their parents.
+		Each state takes the first base where all the slots of its transitions are free.
+		"""
+		children, final = self.__minimal_dawg(keys)
+
+		#number the reachable states and count the keys accepted from each one, children first
+		number = {0: self.ROOT}
+		order = []
+		stack = [(0, iter(sorted(children[0].itervalues())))]
+		while stack:
+			state, pending = stack[-1]
+			for child in pending:
+				if child not in number:
+					number[child] = len(number)
+					stack.append((child, iter(children[child].itervalues())))
+					break
+			else:
+				stack.pop()
+				order.append(state)
+		count = {}
+		for state in order:
+			count[state] = int(final[state]) + sum([count[child] for child in children[state].itervalues()])
+
+		base = array("l", [0] * len(number))
+		terminal = array("b", [0] * len(number))
+		check = array("l", [-1, -1])
+		target = array("l", [0, 0])
+		skip = array("l", [0, 0])
+		free = array("l", [1, 1]) #free[i] leads to the first free slot from i, or is i itself for a free slot
+
+		def first_free(i):
+			j = i
+			while j < len(free) and free[j] != j:
+				j = free[j]
+			while i < len(free) and free[i] != i:
+				free[i], i = j, free[i]
+			return j
+
+		for state in order:
+			terminal[number[state]] = final[state]
+			codes = sorted(children[state])
+			if not codes:
+				continue
+			position = first_free(codes[0] + 1)
+			while True:
+				b = position - codes[0]
+				for code in codes[1:]:
+					if b + code < len(check) and check[b + code] != -1:
+						break
+				else:
+					break
+				position = first_free(position + 1)
+			last = b + codes[-1]
+			if last >= len(check):
+				size = len(check)
+				check.extend([-1] * (last + 1 - size))
+				target.extend([0] * (last + 1 - size))
+				skip.extend([0] * (last + 1 - size))
+				free.extend(xrange(size, last + 1))
+			base[number[state]] = b
+			skipped = int(final[state])
+			for code in codes:
+				child = children[state][code]
+				t = b + code
+				check[t] = number[state]
+				target[t] = number[child]
+				skip[t] = skipped
+				free[t] = t + 1
+				skipped += count[child]
+		self.__base, self.__terminal, self.__check, self.__target, self.__skip = base, terminal, check, target, skip
+
+	def __len__(self):
+		"""
+		Return the count of keys.
+		@rtype: int
+		"""
+		return self.__count
+
+	def __contains__(self, key):
+		"""
+		Check if a key belongs to the trie.
+		@rtype: bool
+		"""
+		return self.index(key) is not None
+
+	def index(self, key):
+		"""
+		Return the index of a key in the sorted keys.
+		The cost depends on the length of the key, not on the count of keys.
+
+		@param key: The key to find.
+		@type key: unicode
+		@return: The index of the key, or C{None} if the key does not belong to the trie.
+		@rtype: int
+		"""
+		matches, stop = self.prefixes(key)
+		if stop == len(key) and matches and matches[-1][0] == len(key):
+			return matches[-1][1]
+		return None
+
+	def keys(self):
+		"""
+		Return the keys, sorted, spelling the paths of the double array.
+		Every transition is looked up for every character of the alphabet, so this is meant for inspection rather than for lookups.
+		@rtype: tuple of unicode
+		"""
+		base, terminal, check, target = self.__base, self.__terminal, self.__check, self.__target
+		chars = sorted([(code, c) for c, code in self.__alphabet.iteritems()], reverse = True)
+		size = len(check)
+		keys = []
+		work = [(self.ROOT, u"")]
+		while work:
+			state, key = work.pop()
+			if terminal[state]:
+				keys.append(key)
+			for code, c in chars:
+				t = base[state] + code
+				if t < size and check[t] == state:
+					work.append((target[t], key + c))
+		return tuple(keys)
+
+	def size(self):
+		"""
+		Return the length of the double array, i.e. the count of transitions plus the unused slots.
+		@rtype: int
+		"""
+		return len(self.__check)
+
+	def states(self):
+		"""
+		Return the count of states of the minimal DAWG.
+		@rtype: int
+		"""
+		return len(self.__base)
+
+	def prefixes(self, stream, start = 0):
+		"""
+		Find the keys that are prefixes of a stream from a position.
+
+		@param stream: The string to search.
+		@type stream: unicode
+		@param start: The position to start from.
+		@type start: int
+		@return: The C{(end, index)} pairs of the matching keys, where the index is the position of the key in the sorted keys, by increasing length,
+			and the position of the first character that could not be followed in the trie, or the length of the stream.
+		@rtype: tuple (list of tuple, int)
+		"""
+		alphabet, base, terminal, check, target, skip = self.__alphabet, self.__base, self.__terminal, self.__check, self.__target, self.__skip
+		matches = []
+		if terminal[self.ROOT]:
+			matches.append((start, 0))
+		size = len(check)
+		state = self.ROOT
+		index = 0
+		for i in xrange(start, len(stream)):
+			code = alphabet.get(stream[i])
+			if code is None:
+				return matches, i
+			t = base[state] + code
+			if t >= size or check[t] != state:
+				return matches, i
+			state = target[t]
+			index += skip[t]
+			if terminal[state]:
+				matches.append((i + 1, index))
+		return matches, len(stream)
+
+	def __repr__(self):
+		"""
+		Return a short string representation of the trie.
+		@rtype: str
+		"""
+		return "%s{%d keys, %d states, %d slots}" % (self.__class__.__name__, len(self), self.states(), self.size())
+
+
+class Trie(object):
+	"""
+	A mutable trie of strings, stored as nested dictionaries.
+
+	Adding or discarding a key costs as much as its length, so the trie can keep up with the keys changed after a L{DoubleArrayTrie} was built,
+	until the double array is built again.
+	"""
+	def __init__(self, keys = ()):
+		"""
+		Build the trie of a set of keys.
+
+		@param keys: The keys to store.
+		@type keys: iterable of unicode
+		"""
+		self.__root = {}
+		self.__count = 0
+		for key in keys:
+			self.add(key)
+
+	def add(self, key):
+		"""
+		Add a key, if missing.
+
+		@param key: The key to add.
+		@type key: unicode
+		"""
+		node = self.__root
+		for c in key:
+			node = node.setdefault(c, {})
+		if None not in node:
+			node[None] = key
+			self.__count += 1
+
+	def discard(self, key):
+		"""
+		Remove a key, if present, along with the nodes left with no keys.
+
+		@param key: The key to remove.
+		@type key: unicode
+		"""
+		path = [self.__root]
+		for c in key:
+			node = path[-1].get(c)
+			if node is None:
+				return
+			path.append(node)
+		if None not in path[-1]:
+			return
+		del path[-1][None]
+		self.__count -= 1
+		for i in xrange(len(key) - 1, -1, -1):
+			if path[i + 1]:
+				break
+			del path[i][key[i]]
+
+	def __len__(self):
+		"""
+		Return the count of keys.
+		@rtype: int
+		"""
+		return self.__count
+
+	def __contains__(self, key):
+		"""
+		Check if a key belongs to the trie.
+		@rtype: bool
+		"""
+		matches, stop = self.prefixes(key)
+		return stop == len(key) and bool(matches) and matches[-1][0] == len(key)
+
+	def keys(self):
+		"""
+		Return the keys, sorted.
+		@rtype: tuple of unicode
+		"""
+		keys = []
+		work = [self.__root]
+		while work:
+			node = work.pop()
+			for c, child in node.iteritems():
+				if c is None:
+					keys.append(child)
+				else:
+					work.append(child)
+		return tuple(sorted(keys))
+
+	def prefixes(self, stream, start = 0):
+		"""
+		Find the keys that are prefixes of a stream from a position, as L{DoubleArrayTrie.prefixes} does, but returning the keys rather than their indices.
+
+		@param stream: The string to search.
+		@type stream: unicode
+		@param start: The position to start from.
+		@type start: int
+		@return: The C{(end, key)} pairs of the matching keys, by increasing length,
+			and the position of the first character that could not be followed in the trie, or the length of the stream.
+		@rtype: tuple (list of tuple, int)
+		"""
+		matches = []
+		node = self.__root
+		if None in node:
+			matches.append((start, node[None]))
+		for i in xrange(start, len(stream)):
+			node = node.get(stream[i])
+			if node is None:
+				return matches, i
+			if None in node:
+				matches.append((i + 1, node[None]))
+		return matches, len(stream)
+
+	def __repr__(self):
+		"""
+		Return a short string representation of the trie.
+		@rtype: str
+		"""
+		return "%s{%d keys}" % (self.__class__.__name__, len(self))
@@ -5,6 +5,7 @@
 A module to create and test Quenya language.
 """
 
+from pylilac.core.bnf import FreeOrder
 from pylilac.core.bnf import KLEENE_CLOSURE
 from pylilac.core.bnf import OPTIONAL_CLOSURE
 from pylilac.core.bnf import Reference
@@ -957,31 +958,6 @@ def run():
 		add_grd("abs")
 
 	def build_grammar(gr):
-		def free_order(*symbols):
-			def perm(symbols):
-				if len(symbols) == 2:
-					return [[symbols[0], symbols[1]], [symbols[1], symbols[0]]]
-				else:
-					p = []
-					for i, s in enumerate(symbols):
-						for m in perm(symbols[:i] + symbols[i + 1:]):
-							n = [s] + m
-							p.append(n)
-					return p
-			cond = None
-			for z in perm(symbols):
-				expr = None
-				for y in z:
-					if expr is None:
-						expr = y
-					else:
-						expr = expr + y
-				if cond is None:
-					cond = expr
-				else:
-					cond = cond | expr
-			return cond
-
 		fin = CategoryFilter("in", ("pres", "past", "perf", "aor", "fut"))
 		n0 = CategoryFilter("ni", "0")
 		pers = CategoryFilter("in", ("s", "pl", "d"))
@@ -1054,53 +1030,53 @@ def run():
 		gr["Vs"] = Reference("Vs:0")
 		for pers in "spd":
 			add_verb(gr, "0", "intr", "V/"+pers)
-			gr["SV"] = free_order(Reference("S/"+pers), Reference("V/"+pers+":0"))
+			gr["SV"] = FreeOrder(Reference("S/"+pers), Reference("V/"+pers+":0"))
 		add_verb(gr, "0", "tr", "Vso")
 		gr["Vso"] = Reference("Vso:Acc")
 		add_verb(gr, "0", "tr", "Vs")
-		gr["VsO"] = free_order(Reference("Vs:Acc"), Reference("O"))
+		gr["VsO"] = FreeOrder(Reference("Vs:Acc"), Reference("O"))
 		for pers in "spd":
 			add_verb(gr, "0", "tr", "V/"+pers)
 			gr["S V O"] = Reference("S/"+pers) + Reference("V/"+pers+":Acc") + Reference("O")
 
 		add_verb(gr, "Dat", "intr", "Vs")
-		gr["VsD"] = free_order(Reference("Vs:Dat"), Reference("D"))
+		gr["VsD"] = FreeOrder(Reference("Vs:Dat"), Reference("D"))
 		add_verb(gr, "Dat", "intr", "V/s")
-		gr["SVD"] = free_order(Reference("S/s"), Reference("V/s:Dat"), Reference("D"))
+		gr["SVD"] = FreeOrder(Reference("S/s"), Reference("V/s:Dat"), Reference("D"))
 		for pers in "spd":
 			add_verb(gr, "Dat", "intr", "V/"+pers)
 			gr["SVD"] = Reference("S/"+pers) + Reference("V/"+pers+":Dat") + Reference("D")
 
 		add_verb(gr, "Dat", "tr", "Vso")
-		gr["VsoD"] = free_order(Reference("Vso:Acc+Dat"), Reference("D"))
+		gr["VsoD"] = FreeOrder(Reference("Vso:Acc+Dat"), Reference("D"))
 
 		add_verb(gr, "Dat", "tr", "Vs")
-		gr["VsOD"] = free_order(Reference("Vs:Acc+Dat"), Reference("O"), Reference("D"))
+		gr["VsOD"] = FreeOrder(Reference("Vs:Acc+Dat"), Reference("O"), Reference("D"))
 
 		for pers in "spd":
 			add_verb(gr, "Dat", "tr", "V/"+pers)
-			gr["S V OD"] = Reference("S/"+pers) +Reference("V/"+pers+":Acc+Dat") + free_order(Reference("O"), Reference("D"))
+			gr["S V OD"] = Reference("S/"+pers) +Reference("V/"+pers+":Acc+Dat") + FreeOrder(Reference("O"), Reference("D"))
 
 
 		gr["clause"] = (Reference("VsL") | Reference("SVL")) + Reference("C-L") * KLEENE_CLOSURE
 		gr["clause"] = (Reference("VsoL") | Reference("VsOL") | Reference("S V OL")) + Reference("C-L") * KLEENE_CLOSURE
 
 		add_verb(gr, "Loc", "intr", "Vs")
-		gr["VsL"] = free_order(Reference("Vs:Loc"), Reference("L"))
+		gr["VsL"] = FreeOrder(Reference("Vs:Loc"), Reference("L"))
 		
 		for pers in "spd":
 			add_verb(gr, "Loc", "intr", "V/"+pers)
-			gr["SVL"] = free_order(Reference("S/s"), Reference("V/"+pers+":Loc"), Reference("L"))
+			gr["SVL"] = FreeOrder(Reference("S/s"), Reference("V/"+pers+":Loc"), Reference("L"))
 		
 
 		add_verb(gr, "Loc", "tr", "Vso")
-		gr["VsoL"] = free_order(Reference("Vso:Acc+Loc"), Reference("L"))
+		gr["VsoL"] = FreeOrder(Reference("Vso:Acc+Loc"), Reference("L"))
 		add_verb(gr, "Loc", "tr", "Vs")
-		gr["VsOL"] = free_order(Reference("Vs:Acc+Loc"), Reference("O"), Reference("L"))
+		gr["VsOL"] = FreeOrder(Reference("Vs:Acc+Loc"), Reference("O"), Reference("L"))
 
 		for pers in "spd":
 			add_verb(gr, "Loc", "tr", "V/"+pers)
-			gr["S V OL"] = Reference("S/"+pers) + Reference("V/"+pers+":Acc+Loc") + free_order(Reference("O"), Reference("L"))
+			gr["S V OL"] = Reference("S/"+pers) + Reference("V/"+pers+":Acc+Loc") + FreeOrder(Reference("O"), Reference("L"))
 
 		gr["clause"] = (Reference("N Vs") | Reference("S N V")) + Reference("C") * KLEENE_CLOSURE
 		gr["clause"] = Reference("S N") + Reference("C") * KLEENE_CLOSURE
@@ -1122,11 +1098,11 @@ def run():
 
 		for pers in "spd":
 			add_verb(gr, "Nom+Dat", "intr", "V-"+pers)
-			gr["N DVs"] = Reference("N/"+pers) + free_order(Reference("D"), Reference("V-"+pers+":Nom+Dat"))
+			gr["N DVs"] = Reference("N/"+pers) + FreeOrder(Reference("D"), Reference("V-"+pers+":Nom+Dat"))
 
 		for pers in "spd":
 			add_verb(gr, "Nom+Dat", "intr", "V/"+pers)
-			gr["S N DV"] = Reference("S/s") + Reference("N/s") + free_order(Reference("D"), Reference("V/"+pers+":Nom+Dat"))
+			gr["S N DV"] = Reference("S/s") + Reference("N/s") + FreeOrder(Reference("D"), Reference("V/"+pers+":Nom+Dat"))
 
 		gr["N/s"] = WordCategoryFilter("adj", (), ("s", "Nom", None)) | (Reference("article") * OPTIONAL_CLOSURE + Reference("Nom/s"))
 		gr["N/p"] = WordCategoryFilter("adj", (), ("pl", "Nom", None)) | (Reference("article") * OPTIONAL_CLOSURE + Reference("Nom/p"))
@@ -1138,13 +1114,13 @@ def run():
 		gr["S/p"] = Reference("article") * OPTIONAL_CLOSURE + Reference("Nom/p") + Reference("nC") * KLEENE_CLOSURE
 		gr["S/d"] = Reference("article") * OPTIONAL_CLOSURE + Reference("Nom/d") + Reference("nC") * KLEENE_CLOSURE
 
-		gr["Nom/s"] = free_order(WordCategoryFilter("n", (), ("s", "Nom", None)), WordCategoryFilter("adj", (), ("s", "Nom", None)))
+		gr["Nom/s"] = FreeOrder(WordCategoryFilter("n", (), ("s", "Nom", None)), WordCategoryFilter("adj", (), ("s", "Nom", None)))
 		gr["Nom/s"] = WordCategoryFilter("n", (), ("s", "Nom", None))
-		gr["Nom/d"] = free_order(WordCategoryFilter("n", (), ("d", "Nom", None)), WordCategoryFilter("adj", (), ("d", "Nom", None)))
+		gr["Nom/d"] = FreeOrder(WordCategoryFilter("n", (), ("d", "Nom", None)), WordCategoryFilter("adj", (), ("d", "Nom", None)))
 		gr["Nom/d"] = WordCategoryFilter("n", (), ("d", "Nom", None))
-		gr["Nom/p"] = free_order(WordCategoryFilter("n", (), ("pl", "Nom", None)), WordCategoryFilter("adj", (), ("pl", "Nom", None)))
+		gr["Nom/p"] = FreeOrder(WordCategoryFilter("n", (), ("pl", "Nom", None)), WordCategoryFilter("adj", (), ("pl", "Nom", None)))
 		gr["Nom/p"] = WordCategoryFilter("n", (), ("pl", "Nom", None))
-		gr["Nom/p"] = free_order(WordCategoryFilter("n", (), ("part", "Nom", None)), WordCategoryFilter("adj", (), ("pl", "Nom", None)))
+		gr["Nom/p"] = FreeOrder(WordCategoryFilter("n", (), ("part", "Nom", None)), WordCategoryFilter("adj", (), ("pl", "Nom", None)))
 		gr["Nom/p"] = WordCategoryFilter("n", (), ("part", "Nom", None))
 		gr["article"] = WordFilter(Word(u"i", Particle(u"i", 1, "adj")))
 
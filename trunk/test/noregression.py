@@ -13,6 +13,7 @@ import unittest
 
 import unit.core.bnf as bnf
 import unit.core.expression as expression
+import unit.core.forest as forest
 import unit.core.fsa as fsa
 import unit.core.grammar as grammar
 import unit.core.interlingua as interlingua
@@ -21,6 +22,7 @@ import unit.core.lect as lect
 import unit.core.lexicon as lexicon
 import unit.core.optiontree as optiontree
 import unit.core.tokenizer as tokenizer
+import unit.core.trie as trie
 import unit.core.utilities as utilities
 
 class NoRegressionRoutine(unittest.TestCase):
@@ -30,6 +32,7 @@ class NoRegressionRoutine(unittest.TestCase):
     def test_core(self):
 		bnf.run()
 		expression.run()
+		forest.run()
 		fsa.run()
 		inflection.run()
 		interlingua.run()
@@ -37,6 +40,7 @@ class NoRegressionRoutine(unittest.TestCase):
 		lexicon.run()
 		optiontree.run()
 		tokenizer.run()
+		trie.run()
 		utilities.run()
 		grammar.run()
 
@@ -3,6 +3,7 @@
 
 
 from pylilac.core.bnf import *
+import pickle
 
 
 def run():
@@ -28,6 +29,26 @@ def run():
 	print Literal("a") + (Literal("b") | Literal("b")) + EPSILON_SYMBOL == Literal("a") + Literal("b")
 	print Literal("a") | Literal("a") | EPSILON_SYMBOL == Literal("a")
 
+	we = Literal("west") | Literal("east")
+	f = ns + we
+	print f, "= (north|south) (west|east)"
+	d = Literal("north") + Literal("east") | Literal("north") + Literal("west") | Literal("south") + Literal("east") | Literal("south") + Literal("west")
+	assert len(list(f)) == 1 and len(list(d)) == 4 and f == d and hash(f) == hash(d), "Factored expression"
+	assert ns + ns + ns != ns + ns, "Factored expression"
+	for x in (Reference("R"), Literal("r"), Reference("R") * KLEENE_CLOSURE, EPSILON_SYMBOL):
+		assert x.to_expression() == x and x == x.to_expression() and hash(x.to_expression()) == hash(x), "Hashing like a single symbol"
+		assert FreeOrder(x) == x and hash(FreeOrder(x)) == hash(x) and len(set([x, x.to_expression(), FreeOrder(x)])) == 1, "Hashing like a single symbol"
+
+	fo = FreeOrder(Literal("a"), Literal("b") | Literal("c"))
+	print fo
+	assert fo == Literal("a") + Literal("b") | Literal("a") + Literal("c") | Literal("b") + Literal("a") | Literal("c") + Literal("a"), "Free order"
+	assert fo == FreeOrder(Literal("b") | Literal("c"), Literal("a")) and hash(fo) == hash(FreeOrder(Literal("b") | Literal("c"), Literal("a"))), "Free order"
+	assert not FreeOrder(EPSILON_SYMBOL) and fo.dependencies() == frozenset(), "Free order"
+	many = [Reference(c) for c in "abcdefghijkl"]
+	big = FreeOrder(*many)
+	assert hash(big) == hash(FreeOrder(*reversed(many))) and big == FreeOrder(*reversed(many)), "Free order hashing"
+	assert big != FreeOrder(*many[1:]) and big != f and hash(big) != hash(FreeOrder(*many[1:])), "Free order hashing"
+
 	a_k=Reference("a")*KLEENE_CLOSURE
 	print a_k, "*"
 	a_p = Reference("a")*POSITIVE_CLOSURE
@@ -35,7 +56,46 @@ def run():
 	a_o = Reference("a")*OPTIONAL_CLOSURE
 	print a_o, "?"
 
+	a_c = Reference("a") * (2, 4)
+	print a_c, "{2,4}"
+	assert `Reference("a") * (0, None)` == "<a>{0,}" and a_c == Reference("a") * (2, 4) and a_c != Reference("a") * (2, 5), "Counted closure"
+	assert a_k != Reference("a") and a_c != Reference("a") and Reference("a") != a_c and (a_c | Reference("a")) != a_c, "Closure equality"
+	assert `Reference("a") * (True, False)` == `a_o` and `Reference("a") * (1, 1)` == "<a>{1,1}", "Counted closure"
+	for c in ((3, 2), (-1, 1), (0, 0)):
+		try:
+			Reference("a") * c
+		except ValueError:
+			pass
+		else:
+			assert False, "Invalid counted closure"
+	try:
+		Reference("a") * (True, 2)
+	except TypeError:
+		pass
+	else:
+		assert False, "Invalid counted closure"
+
 	print _else.match("else")
+	assert Literal("else") is _else and hash(Literal("else")) == hash(_else), "Interning"
+	assert pickle.loads(pickle.dumps(_else, -1)) is _else and pickle.loads(pickle.dumps(_if)) is _if, "Interning"
+	assert Literal(["else"]) == Literal(["else"]) and Literal(["else"]) is not Literal(["else"]), "Unhashable literals"
+	one = Literal(1)
+	assert Literal(True) is not one and Literal(1.0) is not one and Literal(1) is one and type(Literal(True)._content) is bool, "Interning by content type"
+	class Counted(Literal):
+		built = []
+		def __init__(self, content):
+			Counted.built.append(content)
+			Literal.__init__(self, content)
+		def _key(cls, content):
+			return content
+		_key = classmethod(_key)
+	class Upper(Literal):
+		def __init__(self, content):
+			Literal.__init__(self, content.upper())
+	c1 = Counted("c")
+	assert Counted("c") is c1 and Counted.built == ["c"], "Interning before building"
+	u1 = Upper("u")
+	assert Upper("U") is u1 and Upper("u") is u1 and Literal("U") is not u1, "Interning before building"
 
 	
 	#x = Literal("kk") | Reference("s") + s
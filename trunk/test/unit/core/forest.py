@@ -0,0 +1,40 @@
+#!/usr/bin/python
+
+"""
+A module for testing the ParseForest utility class.
+
+@author: Paolo Olmino
+@license: U{GNU GPL GNU General Public License<http://www.gnu.org/licenses/gpl.html>}
+@version: Alpha 0.1.6
+"""
+
+from pylilac.core.forest import *
+
+
+
+
+def run():
+	pf = ParseForest(0)
+	pf.add_option(0, "the", 1)
+	pf.add_option(1, "queen", 2)
+	pf.add_option(2, "of", 3)
+	pf.add_option(3, "hearts", 4)
+	pf.add_option(3, "hearts-2", 4)
+	pf.add_option(1, "queen of hearts", 4)
+	print pf
+	print pf.to_option_tree()
+	print pf.expand()
+	assert len(pf) == 5 and pf.count() == 3 == len(pf.expand()), "Forest count"
+	assert pf.expand() == [["the", "queen", "of", "hearts"], ["the", "queen", "of", "hearts-2"], ["the", "queen of hearts"]], "Forest expansion"
+	assert pf.nodes() == [0, 1, 2, 3, 4], "Topological order"
+
+	#a forest with exponentially many paths and linear size
+	wide = ParseForest(0)
+	for i in range(20):
+		wide.add_option(i, "a", i + 1)
+		wide.add_option(i, "b", i + 1)
+	assert len(wide) == 21 and wide.count() == 2 ** 20, "Packed forest"
+	print wide
+
+if __name__ == "__main__":
+	run()
@@ -12,6 +12,11 @@ Unit test for C{pylilac.core.fsa}.
 """
 
 from pylilac.core.fsa import *
+from pylilac.core.forest import ParseForest
+from StringIO import StringIO
+import os
+import pickle
+import tempfile
 
 
 def run():
@@ -52,6 +57,14 @@ def run():
 	print eaabb
 	print eaabb.reduced()
 	print eaabb.reduced().minimized()
+	assert eaabb.epsilon_closure(1) == frozenset([1, 3]), "Epsilon closure"
+	assert eaabb.epsilon_closures() == {0: frozenset([0, 2]), 1: frozenset([1, 3]), 2: frozenset([2]), 3: frozenset([3])}, "Epsilon closures"
+	eps = eaabb.copy()
+	eps.add_transition(3, EPSILON, 1)
+	eps.add_transition(2, EPSILON, 0)
+	assert eps.epsilon_closure([1]) == frozenset([1, 3]) and eps.epsilon_closure(2) == frozenset([0, 2]), "Epsilon cycles"
+	eps.remove_transitions(2, EPSILON, 0)
+	assert eps.epsilon_closures()[2] == frozenset([2]), "Epsilon closure invalidation"
 	
 	d = {"a": ["A"], "b": ["B"], "ab": ["AB"], "cab": ["CAB"]}	
 	td = FSA()
@@ -75,6 +88,9 @@ def run():
 	print td
 	print td.reduced()
 	print td.reduced().minimized()
+	for fa in (eaabb, td):
+		assert fa.reduced().is_reduced(), "Subset construction"
+	assert len(td.reduced()) == 7, "Subset construction"
 
 	f = FSA() #vi, vivo, vi do
 	f.add_state("")
@@ -94,8 +110,180 @@ def run():
 	d = {"vi":["vi1", "vi2"], "do":["do1","do2","do3"], "vi do": ["vi do"]}
 
 	print tokenize(p, d, "vi do")
-	
+
+	fr = r.freeze()
+	print fr
+	assert fr.freeze() is fr, "Freeze"
+	assert len(fr) == len(r) and fr.is_reduced() and fr.is_minimized(), "Freeze"
+	assert fr.thaw().freeze().transitions_from(fr.get_initial()) == fr.transitions_from(fr.get_initial()), "Thaw"
+	assert `tokenize(Parser(fr), d, "vi do")` == `tokenize(p, d, "vi do")`, "Frozen parser"
+
+	buf = StringIO()
+	fr.dump(buf)
+	buf.seek(0)
+	assert `CompactFSA.load(buf)` == `fr`, "Binary format"
+	handle, filename = tempfile.mkstemp()
+	try:
+		os.write(handle, buf.getvalue())
+		os.close(handle)
+		mf = CompactFSA.map(filename)
+		assert `mf` == `fr` and `pickle.loads(pickle.dumps(mf, -1))` == `fr`, "Mapped binary format"
+		assert mf.original_state(mf.get_initial()) == mf.get_initial(), "Mapped original states"
+		assert `tokenize(Parser(mf), d, "vi do")` == `tokenize(p, d, "vi do")`, "Mapped parser"
+	finally:
+		os.remove(filename)
+	try:
+		CompactFSA.load(StringIO(buf.getvalue()[:-1]))
+	except ValueError:
+		pass
+	else:
+		assert False, "Truncated binary format"
+
+	for s in ("vi dd ", "vi do", "x"):
+		try:
+			p(s)
+		except ParseError, pe:
+			assert r.has_state(pe.state) and str(pe), "Parse error states"
+	assert fr.original_state(fr.get_initial()) == r.get_initial(), "Original states"
+
+	pf = p.parse_forest("vi do ")
+	print pf
+	assert pf.to_option_tree().expand() == p("vi do ").expand() and pf.count() == 2, "Parse forest"
+	for s in ("vi dd ", "vi do"):
+		try:
+			p.parse_forest(s)
+		except ParseError, pe:
+			try:
+				p(s)
+			except ParseError, pe2:
+				assert len(pe) == len(pe2), "Parse forest errors"
+
+	vl = ParseForest(0) #vi do, vi dd, vi ...
+	for i, c in enumerate("vi d"):
+		vl.add_option(i, c, i + 1)
+	vl.add_option(4, "o", 5)
+	vl.add_option(4, "d", 5)
+	vl.add_option(2, ".", 6)
+	vl.add_option(5, " ", 7)
+	vl.add_option(6, ".", 7)
+	lf = p.parse_lattice(vl)
+	print lf
+	assert sorted(lf.expand()) == sorted(p("vi do ").expand()) and lf.count() == 2, "Lattice parsing"
+	assert `Parser(fr).parse_lattice(vl).to_option_tree()` == `lf.to_option_tree()`, "Lattice parsing"
+	for s in ("vi dd ", "vi do"):
+		dl = ParseForest(0)
+		for i, c in enumerate(s):
+			dl.add_option(i, c, i + 1)
+		try:
+			p.parse_lattice(dl)
+		except ParseError, pe:
+			try:
+				p(s)
+			except ParseError, pe2:
+				assert len(pe) == len(pe2) and type(pe) == type(pe2), "Lattice parse errors"
+		else:
+			assert False, "Lattice parse errors"
+	nl = ParseForest(0)
+	nl.add_node(0)
+	assert p.parse_lattice(nl).expand() == p("").expand() == [[]], "Empty lattice"
+	try:
+		Parser(eaabb.reduced().minimized()).parse_lattice(vl)
+	except ParseError, pe:
+		assert len(pe) == 1, "Lattice parse error"
+
+	ps = p.start()
+	for c in "vi d":
+		ps.feed(c)
+	assert not ps.can_finish() and ps.expected_labels() == ["o"], "Session"
+	try:
+		ps.feed("x")
+	except ParseError, pe:
+		assert len(pe) == len(ps) + 1 == 5, "Session error"
+	for c in "o ":
+		ps.feed(c)
+	assert ps.can_finish() and ps.result().expand() == p("vi do ").expand(), "Session"
+
+	lz = LazyDFA(f, 2)
+	assert len(lz) == 0, "Lazy DFA"
+	lp = Parser(lz)
+	assert `tokenize(lp, d, "vi do")` == `tokenize(p, d, "vi do")` and len(lz) < len(r), "Lazy DFA"
+	assert lz.subset(lz.get_initial()) == tuple(sorted(f.epsilon_closure(f.get_initial()))), "Lazy DFA"
+	for s in ("", "ab", "abab", "aab", "aabbb", "ba", "abb"):
+		try:
+			x = Parser(LazyDFA(eaabb, 1))(s).expand()
+		except ParseError:
+			x = None
+		try:
+			y = Parser(eaabb.reduced().minimized())(s).expand()
+		except ParseError:
+			y = None
+		assert x == y, "Lazy DFA on %s" % s
+
+	#(a|b)* a (a|b)^8 has 2^9 deterministic states: the lazy DFA keeps the transitions of a few of them
+	kth = FSA()
+	kth.add_transition(0, "a", 0)
+	kth.add_transition(0, "b", 0)
+	kth.add_transition(0, "a", 1)
+	for i in range(1, 9):
+		kth.add_transition(i, "a", i + 1)
+		kth.add_transition(i, "b", i + 1)
+	kth.set_final(9)
+	lk = LazyDFA(kth, 16)
+	mk = Parser(kth.reduced().minimized())
+	for i in range(600):
+		s = "".join(["ab"[(i >> j) & 1] for j in range(12)])
+		try:
+			x = Parser(lk)(s).expand()
+		except ParseError:
+			x = None
+		try:
+			y = mk(s).expand()
+		except ParseError:
+			y = None
+		assert x == y, "Bounded lazy DFA on %s" % s
+	assert len(lk) <= 16, "Bounded lazy DFA"
+	sc = StateCache(3)
+	for k in "abcd":
+		sc[k] = k.upper()
+	assert sc.keys() == ["b", "c", "d"] and sc.get("a") is None, "State cache eviction"
+	for i in range(20):
+		assert sc.get("b") == "B", "State cache"
+	sc["e"] = "E"
+	assert sc.keys() == ["d", "b", "e"] and len(sc) == 3 and "c" not in sc, "State cache eviction"
+
+	sp = FSA()
+	sp.add_transition(0, "x", 1, ("X",))
+	sp.set_final(1)
+	copies = sp.splice(eaabb.reduced().minimized(), 1, 1, lambda t: ("E",))
+	assert len(copies) == len(eaabb.reduced().minimized()) and len(sp) == 2 + len(copies), "Splice"
+	assert Parser(sp.reduced().minimized())("xab").expand() == [[("x", ("X",)), ("a", ("E",)), ("b", ("E",))]], "Splice"
+
+	#2^n paths: parsing is bounded by memoization
+	amb = FSA()
+	amb.add_transition(0, "a", 0, 1)
+	amb.add_transition(0, "a", 0, 2)
+	amb.set_final(0)
+	try:
+		Parser(amb)("a" * 40 + "b")
+	except ParseError, pe:
+		assert len(pe) == 41, "Memoized parse error"
+	assert len(Parser(amb)("a" * 40)) == 2, "Memoized parsing"
+
 	k = r.copy()
+	k.add_transition(k.get_initial(), "z", "dead-end")
+	k.add_transition("unreachable", "z", k.get_initial())
+	assert k.prune_unreachable() == 1 and k.prune_dead() == 1, "Pruning"
+	assert k.transitions_from(k.get_initial()) == r.transitions_from(r.get_initial()), "Pruning"
+	k.remove_state(k.get_initial())
+	assert k.has_state(k.get_initial()) and not k.has_state(r.get_initial()), "Initial state removal"
+	k = r.copy()
+	k.remove_states([e for l, e, t in r.transitions_from(r.get_initial())])
+	n = len(k)
+	assert k.transitions_from(k.get_initial()) == [] and k.prune_unreachable() == n - 1, "Bulk removal"
+	k = r.copy()
+	for l, e, t in r.transitions_from(r.get_initial()):
+		k.remove_transitions(r.get_initial(), l, e)
+	assert k.prune_unreachable() == len(r) - 1, "Transition removal"
 	
 	#Quenya Locative bug ()
 	"""
@@ -135,6 +323,47 @@ def run():
 	loc.set_final(1)
 	print loc.minimized()
 	assert loc.minimized().is_minimized(),  "Locative bug"
+	assert len(loc.minimized()) == len(loc.minimized_by_signatures()), "Hopcroft"
+
+	#dead states are dropped, so parse errors come at the first token leaving the live states
+	dead = FSA()
+	dead.add_transition(0, "a", 1)
+	dead.add_transition(0, "b", 2)
+	dead.add_transition(2, "c", 3)
+	dead.set_final(1)
+	assert len(dead.minimized()) == 2 and len(dead.minimized_by_signatures()) == 4, "Dead states"
+	for fa, length, error in ((dead.minimized(), 1, ParseError), (dead.minimized_by_signatures(), 2, ExpectedStopError)):
+		try:
+			Parser(fa)("bc")
+		except ParseError, pe:
+			assert len(pe) == length and type(pe) == error, "Dead states parse error"
+		else:
+			assert False, "Dead states parse error"
+
+	#(ab)*, unrolled twice
+	abab = FSA()
+	abab.add_transition(0, "a", 1)
+	abab.add_transition(1, "b", 2)
+	abab.add_transition(2, "a", 3)
+	abab.add_transition(3, "b", 0)
+	abab.set_final(0)
+	abab.set_final(2)
+	print abab.minimized()
+	assert len(abab.minimized()) == 2 and len(abab.minimized_by_signatures()) == 4, "Hopcroft on cycles"
+	for fa in (eaabb, td, f):
+		m, n = fa.reduced().minimized(), fa.reduced().minimized_by_signatures()
+		assert m.is_minimized() and len(m) <= len(n), "Hopcroft"
+	assert `tokenize(Parser(f.reduced().minimized()), d, "vi do")` == `tokenize(p, d, "vi do")`, "Hopcroft"
+	for s in ("", "ab", "abab", "aab", "aabbb", "ba", "abb"):
+		try:
+			x = Parser(eaabb.reduced().minimized())(s).expand()
+		except ParseError:
+			x = None
+		try:
+			y = Parser(eaabb.reduced().minimized_by_signatures())(s).expand()
+		except ParseError:
+			y = None
+		assert x == y, "Hopcroft on %s" % s
 	
 
 
@@ -10,6 +10,12 @@
 
 from pylilac.core.grammar import *
 from pylilac.core.bnf import *
+from pylilac.core.fsa import ParseError
+from pylilac.core.forest import ParseForest
+import os
+import pickle
+import shutil
+import tempfile
 
 
 
@@ -20,9 +26,273 @@ def run():
 	g["S"] =   Literal(u"noun") | Reference("S2")
 	g["S2"] =  Literal(u"subnoun")
 	print `g`
-	print g.browse()
+	a = g.browse()
+	print a
+	assert a.order == ("S2", "S", "V", "SV") and a.depth() == 2 and a.depth("S") == 1 and a.is_valid(), "Analysis"
+	assert g.analyze() is a, "Analysis"
+	c = Grammar("Cyclic")
+	c["A"] = Reference("B") + Reference("X")
+	c["B"] = Reference("C") | Literal(u"b")
+	c["C"] = Reference("A") + Reference("C") | Reference("Y")
+	c["D"] = Reference("D")
+	ca = c.analyze()
+	print ca
+	assert ca.cycles == (("A", "B", "C"),) and ca.undefined == frozenset(["X", "Y"]) and not ca.is_valid(), "Cycles"
+	try:
+		c.browse()
+	except CyclicReferenceError, cre:
+		assert cre.args == ("A", "B"), "Cycles"
+	c.start = "D"
+	assert c.analyze().cycles == (("D",),), "Cycles"
+	dag = Grammar("DAG")
+	for i in range(40):
+		dag["L%d" % i] = Reference("L%d" % (i + 1)) + Reference("L%d" % (i + 1))
+	dag["L40"] = Literal(u"x")
+	assert dag.browse().depth() == 40, "Shared symbols analysis"
 	p = g.compile()
 	print repr(p)
+	lp = g.compile(True, True)
+	print lp.get_fsa()
+	assert lp is not p and g.compile() is lp, "Lazy compiling"
+	for s in ([u"noun", u"verb"], [u"subnoun", u"verb"]):
+		assert lp(s).expand() == p(s).expand(), "Lazy parsing"
+	q = pickle.loads(pickle.dumps(p, -1))
+	assert "_GrammarParser__dispatch" not in p.__getstate__() and len(q._GrammarParser__dispatch) == 0, "Dispatch indices not pickled"
+	assert q([u"noun", u"verb"]).expand() == p([u"noun", u"verb"]).expand(), "Dispatch indices not pickled"
+	assert 0 < len(q._GrammarParser__dispatch) < len(q.get_fsa()), "States indexed on demand"
+
+	class Broken(unicode):
+		def dispatch_keys(self):
+			return self.missing
+	try:
+		p([Broken(u"noun"), u"verb"])
+	except AttributeError:
+		pass
+	else:
+		assert False, "Errors in dispatch keys"
+
+	h = Grammar("Shared")
+	h["S"] = Reference("N") + Reference("N") + Reference("M")
+	h["M"] = Reference("N") | Literal(u"z")
+	h["N"] = Literal(u"a") + Literal(u"b") | Literal(u"a") + Literal(u"c") | Literal(u"a") + Literal(u"d") | Literal(u"a") + Literal(u"e")
+	hp = h.compile()
+	print hp.get_fsa()
+	assert hp([u"a", u"b", u"a", u"c", u"a", u"e"]).expand() == [[(u"a", ("N",)), (u"b", ("N",)), (u"a", ("N",)), (u"c", ("N",)), (u"a", ("M", "N")), (u"e", ("M", "N"))]], "Shared symbols"
+	assert len(hp.get_fsa()) == 7, "Shared symbols"
+	assert h.dependents("N") == frozenset(["S", "M"]) and h.compile() is hp, "Dependencies"
+	h["N"] = Literal(u"f")
+	hq = h.compile()
+	assert hq is not hp and len(hq([u"f", u"f", u"f"]).expand()) == 1, "Recompiling after changes"
+	del h["M"]
+	assert h.dependents("N") == frozenset(["S"]), "Dependencies"
+	h["M"] = Literal(u"z")
+	assert len(h.compile()([u"a", u"b", u"f", u"z"]).expand()) == 1, "Recompiling after changes"
+	h2 = pickle.loads(pickle.dumps(h, -1))
+	assert h2.dependents("N") == frozenset(["S"]) and `h2.compile(True).get_fsa()` == `h.compile().get_fsa()`, "Pickling"
+	r = g.compile(True, recursive = True)
+	print r
+	for s in ([u"noun", u"verb"], [u"subnoun", u"verb"]):
+		assert r(s).expand() == p(s).expand(), "Recursive parsing"
+	assert g.compile() is r, "Recursive compiling"
+	e = Grammar("Expression")
+	e["E"] = Reference("E") + Literal(u"+") + Reference("T") | Reference("T")
+	e["T"] = Literal(u"n") | Literal(u"(") + Reference("E") + Literal(u")")
+	re = e.compile(recursive = True)
+	assert re([u"n", u"+", u"n", u"+", u"n"]).expand() == [[(u"n", ("E", "E", "T")), (u"+", ("E",)), (u"n", ("E", "T")), (u"+", ()), (u"n", ("T",))]], "Left recursion"
+	assert len(re([u"(", u"n", u"+", u"n", u")"])) == 1, "Recursion"
+	try:
+		re([u"n", u"+"])
+	except ParseError, pe:
+		assert len(pe) == 2, "Recursive parse error"
+	deep = re([u"n"] + [u"+", u"n"] * 300).expand()
+	assert len(deep) == 1 and deep[0][0] == (u"n", ("E",) * 300 + ("T",)), "Deep left recursion"
+	gl = ParseForest(0)
+	gl.add_option(0, u"noun", 1)
+	gl.add_option(0, u"subnoun", 1)
+	gl.add_option(0, u"verb", 1)
+	gl.add_option(1, u"verb", 2)
+	for parser in (p, lp, r):
+		assert sorted(parser.parse_lattice(gl).expand()) == sorted(p([u"noun", u"verb"]).expand() + p([u"subnoun", u"verb"]).expand()), "Lattice parsing"
+	el = ParseForest(0)
+	for i, token in enumerate([u"n", u"+", u"n", u"+", u"n"]):
+		el.add_option(i, token, i + 1)
+	el.add_option(1, u")", 2)
+	el.add_option(2, u"n", 5)
+	assert sorted(re.parse_lattice(el).expand()) == sorted(re([u"n", u"+", u"n", u"+", u"n"]).expand() + re([u"n", u"+", u"n"]).expand()), "Recursive lattice parsing"
+	nl = ParseForest(0)
+	nl.add_node(0)
+	try:
+		re.parse_lattice(nl)
+	except ParseError, pe:
+		assert len(pe) == 0, "Recursive lattice parse error"
+	else:
+		assert False, "Recursive lattice parse error"
+	e["T"] = Literal(u"m")
+	assert e.compile(recursive = True) is not re and len(e.compile()([u"m", u"+", u"n"])) == 1, "Recursive recompiling"
+	#incremental recompiling: only the FSA of the modified symbol is rebuilt
+	inc = Grammar("Incremental")
+	inc["S"] = Reference("A") + Reference("B") + Reference("C")
+	inc["A"] = Literal(u"a") | Reference("B")
+	inc["B"] = Literal(u"b")
+	inc["C"] = Literal(u"c") + Reference("C") | Literal(u"c")
+	before = inc.compile(recursive = True).get_network()
+	inc["B"] = Literal(u"b") | Literal(u"d")
+	after = inc.compile(recursive = True).get_network()
+	assert [symbol for symbol in sorted(after) if after[symbol] is not before[symbol]] == ["B"], "Incremental recompiling"
+	assert len(inc.compile()([u"d", u"d", u"c"])) == 1, "Incremental recompiling"
+
+	z = Grammar("Nullable")
+	z["A"] = Reference("A") | Literal(u"y") | Reference("B") + Reference("A") + Literal(u"x")
+	z["B"] = Reference("C") * OPTIONAL_CLOSURE
+	z["C"] = Literal(u"b")
+	assert len(z.compile(recursive = True)([u"b", u"y", u"x"]).expand()) > 0, "Nullable recursion"
+	#a nullable symbol called twice: ambiguous derivations with the same tags are given once, as in a flat compiling
+	am = []
+	for i in range(2):
+		a = Grammar("Ambiguous")
+		a["S"] = Reference("X") + Reference("X") + Reference("X") + Reference("L")
+		a["X"] = Reference("A") * OPTIONAL_CLOSURE
+		a["L"] = Literal(u"z") | Reference("A") + Literal(u"z")
+		a["A"] = Literal(u"a")
+		am.append(a)
+	ap = am[0].compile()
+	ar = am[1].compile(recursive = True)
+	for s in ([u"z"], [u"a", u"z"], [u"a", u"a", u"z"], [u"a", u"a", u"a", u"a", u"z"]):
+		assert sorted(ar(s).expand()) == sorted(ap(s).expand()), "Ambiguous recursion"
+	assert len(ar([u"a", u"z"]).expand()) == 2, "Ambiguous recursion"
+	al = ParseForest(0)
+	al.add_option(0, u"a", 1)
+	al.add_option(0, u"a", 2)
+	al.add_option(1, u"a", 2)
+	al.add_option(2, u"z", 3)
+	assert sorted(ar.parse_lattice(al).expand()) == sorted(ap.parse_lattice(al).expand()), "Ambiguous recursion"
+	for recursive in (False, True):
+		cl = Grammar("Closure in an alternative")
+		cl["S"] = Reference("X") * KLEENE_CLOSURE | Literal(u"y")
+		cl["X"] = Literal(u"x")
+		cp = cl.compile(recursive = recursive)
+		assert len(cp([u"x", u"x"]).expand()) == 1 and len(cp([u"y"]).expand()) == 1, "Closure in an alternative"
+		try:
+			cp([u"x", u"y"])
+		except ParseError:
+			pass
+		else:
+			assert False, "Closure in an alternative"
+	fo = Grammar("Free order")
+	fo["S"] = FreeOrder(Reference("X"), Reference("Y"), Reference("Z"))
+	fo["X"] = Literal(u"x")
+	fo["Y"] = Literal(u"y") | Literal(u"w")
+	fo["Z"] = Literal(u"z")
+	pm = Grammar("Permutations")
+	for x, y, z in ((0, 1, 2), (0, 2, 1), (1, 0, 2), (1, 2, 0), (2, 0, 1), (2, 1, 0)):
+		pm["S"] = Reference(["X", "Y", "Z"][x]) + Reference(["X", "Y", "Z"][y]) + Reference(["X", "Y", "Z"][z])
+	pm["X"] = Literal(u"x")
+	pm["Y"] = Literal(u"y") | Literal(u"w")
+	pm["Z"] = Literal(u"z")
+	fp = fo.compile()
+	for s in ([u"x", u"y", u"z"], [u"z", u"w", u"x"], [u"y", u"x", u"z"]):
+		assert fp(s).expand() == pm.compile()(s).expand(), "Free order"
+	for s in ([u"x", u"x", u"z"], [u"x", u"y"]):
+		try:
+			fp(s)
+		except ParseError:
+			pass
+		else:
+			assert False, "Free order"
+	a = Reference("A")
+	for closure, unrolled in (((2, 4), a + a | a + a + a | a + a + a + a),
+			((0, 2), EPSILON_SYMBOL | a | a + a),
+			((2, None), a + a * POSITIVE_CLOSURE)):
+		cg = Grammar("Counted")
+		cg["S"] = Reference("A") * closure + Literal(u"z")
+		cg["A"] = Literal(u"a") | Literal(u"b") + Literal(u"c")
+		ug = Grammar("Unrolled")
+		ug["S"] = unrolled + Literal(u"z")
+		ug["A"] = Literal(u"a") | Literal(u"b") + Literal(u"c")
+		cp, up = cg.compile(), ug.compile()
+		assert len(cp.get_fsa()) == len(up.get_fsa()), "Counted closure on %s" % `closure`
+		for n in range(6):
+			s = [u"a", u"b", u"c"] * n + [u"z"]
+			try:
+				x = cp(s).expand()
+			except ParseError:
+				x = None
+			try:
+				y = up(s).expand()
+			except ParseError:
+				y = None
+			assert x == y, "Counted closure on %s" % `closure`
+	k = Grammar("Closure")
+	k["S"] = Reference("X") * KLEENE_CLOSURE | Reference("Y")
+	k["X"] = Literal(u"x")
+	k["Y"] = Literal(u"y")
+	kp = k.compile()
+	assert len(kp([u"x", u"x"])) == 1 and len(kp([u"y"])) == 1, "Closure in alternative"
+	for s in ([u"x", u"y"], [u"y", u"x"]):
+		try:
+			kp(s)
+		except ParseError:
+			pass
+		else:
+			assert False, "Closure in alternative"
+	def clause():
+		c = Grammar("Clause")
+		c["S"] = Reference("N") + Reference("V") * OPTIONAL_CLOSURE
+		c["V"] = Literal(u"verb") | FreeOrder(Literal(u"verb"), Reference("N"))
+		c["N"] = Literal(u"noun")
+		return c
+	c = clause()
+	c2 = clause()
+	c2.name = "Other clause"
+	del c2["S"]
+	c2["S"] = Reference("N") + Reference("V") * OPTIONAL_CLOSURE
+	c2.start = "S"
+	assert c.content_hash() == c2.content_hash() and c.content_hash() != g.content_hash(), "Content hash"
+	c2["N"] = Literal(u"pronoun")
+	assert c.content_hash() != c2.content_hash(), "Content hash"
+	c3 = clause()
+	del c3["V"]
+	c3["V"] = FreeOrder(Literal(u"verb"), Reference("N")) | Literal(u"verb")
+	assert c.content_hash() != c3.content_hash(), "Content hash of reordered alternatives"
+	cache = tempfile.mkdtemp()
+	previous_cache = Grammar.CACHE_DIRECTORY
+	Grammar.CACHE_DIRECTORY = cache
+	try:
+		cp = c.compile()
+		assert len(os.listdir(cache)) == 1, "Compile cache"
+		#a different parser stored under the hash of c proves that the cache is used
+		f = open(os.path.join(cache, os.listdir(cache)[0]), "wb")
+		pickle.dump(g.compile(True), f, -1)
+		f.close()
+		assert clause().compile()([u"noun", u"verb"]).expand() == g.compile()([u"noun", u"verb"]).expand(), "Compile cache"
+		assert clause().compile(True)([u"noun", u"noun", u"verb"]).expand() == cp([u"noun", u"noun", u"verb"]).expand(), "Compile cache"
+		assert len(clause().compile(recursive = True)([u"noun", u"verb"])) == 1 and len(os.listdir(cache)) == 3, "Compile cache"
+		f = open(os.path.join(cache, os.listdir(cache)[0]), "wb")
+		f.write("corrupted")
+		f.close()
+		assert len(clause().compile()([u"noun", u"verb", u"noun"])) == 1, "Corrupted compile cache"
+		#a parser that can not be pickled is not stored
+		class Local(Literal):
+			pass
+		up = clause()
+		del up["N"]
+		up["N"] = Local(u"noun")
+		assert len(up.compile()([u"noun", u"verb"])) == 1 and len(os.listdir(cache)) == 3, "Unpicklable compile cache"
+		if hasattr(os, "getuid"):
+			#a directory other users can write to is not used
+			os.chmod(cache, 0777)
+			f = open(os.path.join(cache, os.listdir(cache)[0]), "wb")
+			pickle.dump(g.compile(True), f, -1)
+			f.close()
+			assert len(clause().compile()([u"noun", u"verb", u"noun"])) == 1, "Shared compile cache"
+			assert len(clause().compile(recursive = True)([u"noun", u"verb", u"noun"])) == 1, "Shared compile cache"
+			os.chmod(cache, 0700)
+			os.chmod(os.path.join(cache, os.listdir(cache)[0]), 0666)
+			assert len(clause().compile()([u"noun", u"verb", u"noun"])) == 1, "Shared compile cache"
+	finally:
+		Grammar.CACHE_DIRECTORY = previous_cache
+		shutil.rmtree(cache)
+
 	#print p([u"noun",u"noun",u"noun",u"noun",u"stop",u"verb"])
 
 
@@ -1,17 +1,34 @@
-#!/usr/bin/python
-"""
-@author: Paolo Olmino
-@license: U{GNU GPL GNU General Public License<http://www.gnu.org/licenses/gpl.html>}
-@version: Alpha 0.1.6
-"""
-
-from pylilac.core.lect import *
-
-
-def run():
-	pass
-
-
-if __name__ == "__main__":
-	run()
-
+#!/usr/bin/python
+"""
+@author: Paolo Olmino
+@license: U{GNU GPL GNU General Public License<http://www.gnu.org/licenses/gpl.html>}
+@version: Alpha 0.1.6
+"""
+
+from pylilac.core.lect import *
+from pylilac.core.lexicon import Word, Lexeme, WordCategoryFilter
+from pylilac.core.bnf import Reference
+
+
+def run():
+	l = Lect("tok")
+	l.append_p_o_s("noun", (), ())
+	l.append_p_o_s("verb", (), ())
+	l.lexicon.add_word(Word(u"jan", Lexeme(u"jan", 1, "noun", (), "person")))
+	l.lexicon.add_word(Word(u"moku", Lexeme(u"moku", 1, "verb", (), "eat")))
+	l.grammar["S"] = Reference("N") + Reference("V")
+	l.grammar["N"] = WordCategoryFilter("noun")
+	l.grammar["V"] = WordCategoryFilter("verb")
+	l.compile()
+	print l.read(u"jan moku")
+	assert len(l.read(u"jan moku")) == 1, "Reading"
+	network = l.grammar.compile().get_network()
+	#modifying a rule only recompiles the automaton of its symbol and of the symbols depending on it
+	l.grammar["V"] = Reference("N") + WordCategoryFilter("verb")
+	assert len(l.read(u"jan jan moku")) == 1, "Reading after modifying a rule"
+	recompiled = l.grammar.compile().get_network()
+	assert recompiled["N"] is network["N"] and recompiled["V"] is not network["V"], "Incremental compiling"
+
+
+if __name__ == "__main__":
+	run()
@@ -8,6 +8,8 @@
 """
 
 from pylilac.core.lexicon import *
+from pylilac.core.tokenizer import UnknownTokenException
+import pickle
 
 def run():
 	lx = Lexicon()
@@ -24,6 +26,28 @@ def run():
 	print lx
 	tk = lx.compile({"separator": " "})
 	print tk(u"jan li moku")
+	assert len(tk(u"jan li moku").expand()) == 2, "Compiled lexicon"
+	w = lx.add_word(Word(u"pona", Lexeme(u"pona", 1, "adjective", (), "bene")))
+	assert lx.compile({"separator": " "}) is tk and len(tk(u"jan li pona").expand()) == 1, "Incremental compiling"
+	lx.remove_word(w)
+	lx.remove_lemma_by_key((u"moku", 2))
+	assert len(tk(u"jan li moku").expand()) == 1 and lx.compile({"separator": " "}) is tk, "Incremental compiling"
+	try:
+		tk(u"jan li pona")
+	except UnknownTokenException:
+		pass
+	else:
+		assert False, "Incremental compiling"
+	assert lx.compile({"separator": " "}, True) is not tk and `lx.compile({"separator": " "})(u"jan li moku")` == `tk(u"jan li moku")`, "Forced compiling"
+	lx2 = pickle.loads(pickle.dumps(lx, -1))
+	lx2.add_word(Word(u"pona", Lexeme(u"pona", 1, "adjective", (), "bene")))
+	assert len(lx2.compile({"separator": " "})(u"jan li pona").expand()) == 1, "Pickled compiling"
+	assert pickle.loads(pickle.dumps(lx2, -1)).compile({"separator": " "})(u"jan li pona").expand() == lx2.compile({"separator": " "})(u"jan li pona").expand(), "Pickled compiling"
+	tk = lx2.compile({"separator": " "})
+	properties = {"separator": "_"}
+	tu = lx2.compile(properties)
+	properties["separator"] = " "
+	assert tu is not tk and len(tu(u"jan_li_pona").expand()) == 1 and lx2.compile({"separator": "_"}) is tu, "Compiling with other properties"
 
 	lx = WordCategoryFilter("noun")
 	lx1 = WordCategoryFilter("noun", ("m", CategoryFilter("in", ["pl","s"])))
@@ -34,6 +58,12 @@ def run():
 	print `lx2`
 	print `lx3`
 	print lx1.match(w), lx2.match(w), lx3.match(w)
+	for f in (lx1, lx2, lx3):
+		assert f.dispatch_key() in w.dispatch_keys(), "Dispatch keys"
+	assert WordCategoryFilter().dispatch_key() is None, "Dispatch keys"
+	assert WordCategoryFilter("noun") is lx and WordFilter(Word(u"man", Lexeme(u"man", 1, "n", (), "None"))) is lx3, "Interning"
+	assert WordCategoryFilter("noun", lx1.lemma_categories()) is lx1 and WordCategoryFilter("noun") is not WordFilter(Word(u"man", Lexeme(u"man", 1, "n", (), "None"))), "Interning"
+	assert pickle.loads(pickle.dumps(lx3, -1)) is lx3 and hash(pickle.loads(pickle.dumps(lx1))) == hash(lx1), "Interning"
 	
 
 	cf = CategoryFilter("in", ("A","B"))
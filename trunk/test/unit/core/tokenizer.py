@@ -10,6 +10,8 @@ Unit test for tokenizer.
 """
 
 from pylilac.core.tokenizer import *
+from StringIO import StringIO
+import pickle
 
 
 def run():
@@ -18,9 +20,82 @@ def run():
 	print c
 	t2 = Tokenizer({"ala": ["ALA"], "mi": ["MI"], "pona": ["PONA","BENE"], "mi ala": ["MIALA"]}, {"separator": " "})
 	print t2("mi ala pona")
+	f = StringIO()
+	pickle.dump(t2.get_trie(), f, -1)
+	f.seek(0)
+	t2b = Tokenizer({"ala": ["ALA"], "mi": ["MI"], "pona": ["PONA","BENE"], "mi ala": ["MIALA"]}, {"separator": " "}, pickle.load(f))
+	assert `t2b("mi ala pona")` == `t2("mi ala pona")`, "Loaded tokenizer"
+	assert len(t2("mi ala pona").expand()) == 4, "Multiword tokens"
+	try:
+		t2("mi alax pona")
+	except UnknownTokenException, ute:
+		assert ute.args == (u"alax...",), "Unknown token"
+	else:
+		assert False, "Unknown token"
 	t3 = Tokenizer({"a": ["*a*"], "bb": ["*bb*"], "b": ["*b*"]}, {"separator": ""})
 	c3 = t3("abba")
 	print c3
+	assert len(c3.expand()) == 2, "Tokenizing with no separator"
+	t4 = Tokenizer({u"a": [u"A"], u"ba": [u"BA"], u"baaa": [u"BAAA"]}, {"separator": ""})
+	assert len(t4(u"baa").expand()) == 1 and len(t4(u"baaa").expand()) == 2, "Overlapping keys with no separator"
+
+	l2 = t2.lattice("mi ala pona")
+	print l2
+	assert sorted(l2.expand()) == sorted(t2("mi ala pona").expand()) and l2.count() == 4, "Word lattice"
+	assert sorted(t2.parse_forest("mi ala pona").expand()) == sorted(l2.expand()), "Parse forest"
+	assert sorted(l2.options(3)) == [("ALA", 7)] and sorted(l2.options(7)) == [("BENE", 11), ("PONA", 11)], "Word lattice"
+	assert t3.lattice("").count() == 1 and len(t3.lattice("abba")) == 5, "Word lattice with no separator"
+	try:
+		t2.lattice("mi alax pona")
+	except UnknownTokenException, ute:
+		assert ute.args == (u"alax...",), "Unknown token in lattice"
+	else:
+		assert False, "Unknown token in lattice"
+	#2^n readings: the lattice grows linearly
+	t5 = Tokenizer({u"a": [u"A1", u"A2"], u"aa": [u"AA"]}, {"separator": u""})
+	l5 = t5.lattice(u"a" * 60)
+	assert len(l5) == 61 and l5.count() > 2 ** 60 and len(t5(u"a" * 3).expand()) == 12, "Ambiguous lattice"
+	assert len(t.lattice(u" ".join([u"a", u"b"] * 2000))) == 4001, "Long lattice"
+
+	m = {"ala": ["ALA"], "mi": ["MI"], "pona": ["PONA"]}
+	t6 = Tokenizer(m, {"separator": " "})
+	m["pona"].append("BENE")
+	assert len(t6("mi ala pona").expand()) == 1, "Copied map"
+	t6.add("mi ala", "MIALA")
+	t6.add("pona", "BENE")
+	assert `t6("mi ala pona")` == `t2("mi ala pona")`, "Added tokens"
+	t6.remove("ala", "ALA")
+	assert t6("mi ala pona").expand() == [["MIALA", "PONA"], ["MIALA", "BENE"]], "Removed tokens"
+	try:
+		t6("ala pona")
+	except UnknownTokenException:
+		pass
+	else:
+		assert False, "Removed tokens"
+	t6.remove("mi ala", "MIALA")
+	t6.add("ala", "ALA")
+	t6.add("mi ala", "MIALA")
+	try:
+		t6.remove("mi", "MIALA")
+	except ValueError:
+		pass
+	else:
+		assert False, "Removing unknown tokens"
+	t7 = pickle.loads(pickle.dumps(t6, -1))
+	t6.remove("mi ala", "MIALA")
+	assert `t7("mi ala pona")` == `t2("mi ala pona")` and len(t6("mi ala pona").expand()) == 2, "Pickled updates"
+	t8 = Tokenizer({"ala": ["ALA"], "pona": ["PONA"], "sina": ["SINA"]}, {"separator": " "}, t2.get_trie())
+	assert t8("sina ala pona").expand() == [["SINA", "ALA", "PONA"]], "Outdated trie"
+	for s in ("mi ala", "mi"):
+		try:
+			t8(s)
+		except UnknownTokenException:
+			pass
+		else:
+			assert False, "Outdated trie"
+	t9 = Tokenizer.__new__(Tokenizer)
+	t9.__setstate__({"_separator": " ", "_Tokenizer__dict": {"ala": ["ALA"], "mi": ["MI"], "pona": ["PONA", "BENE"], "mi ala": ["MIALA"], "jan": []}})
+	assert `t9("mi ala pona")` == `t2("mi ala pona")` and t9.get_trie().keys() == ("ala", "mi", "mi ala", "pona"), "Earlier pickles"
 
 
 
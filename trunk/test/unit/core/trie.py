@@ -0,0 +1,71 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+"""
+A module for testing the DoubleArrayTrie and Trie utility classes.
+
+@author: Paolo Olmino
+@license: U{GNU GPL GNU General Public License<http://www.gnu.org/licenses/gpl.html>}
+@version: Alpha 0.1.6
+"""
+
+from pylilac.core.trie import *
+import pickle
+
+
+def spelled(trie, result):
+	"""
+	Replace the indices of the keys found by a double-array trie with the keys.
+	"""
+	keys = trie.keys()
+	matches, stop = result
+	return [(end, keys[index]) for end, index in matches], stop
+
+def run():
+	keys = [u"mi", u"mi ala", u"ala", u"pona", u"po", u"jan", u"él", u""]
+	t = DoubleArrayTrie(keys + [u"mi"])
+	print t
+	assert len(t) == 8 and t.keys() == tuple(sorted(keys)), "Trie keys"
+	for k in keys:
+		assert k in t and t.index(k) == sorted(keys).index(k), "Trie lookup"
+	for k in (u"m", u"mi a", u"ponax", u"x"):
+		assert k not in t and t.index(k) is None, "Trie lookup"
+	assert t.prefixes(u"mi ala pona") == ([(0, 0), (2, 3), (6, 4)], 6), "Trie prefixes"
+	assert spelled(t, t.prefixes(u"mi ala pona")) == ([(0, u""), (2, u"mi"), (6, u"mi ala")], 6), "Trie prefixes"
+	assert spelled(t, t.prefixes(u"mi ala pona", 7)) == ([(7, u""), (9, u"po"), (11, u"pona")], 11), "Trie prefixes"
+	assert spelled(t, t.prefixes(u"jon", 0)) == ([(0, u"")], 1), "Trie dead end"
+	t2 = pickle.loads(pickle.dumps(t, -1))
+	assert t2.keys() == t.keys() and t2.prefixes(u"mi ala") == t.prefixes(u"mi ala"), "Trie pickling"
+	assert "_DoubleArrayTrie__keys" not in t.__dict__, "Keys not stored"
+	e = DoubleArrayTrie([])
+	assert len(e) == 0 and e.keys() == () and e.prefixes(u"a") == ([], 0), "Empty trie"
+
+	#the states of a large trie are packed in the double array, and the keys share their suffixes
+	forms = [u"%s%s%s" % (a, b, c) for a in u"kmnpst" for b in u"aeiou" for c in (u"", u"la", u"lan", u"li", u"n")]
+	big = DoubleArrayTrie(forms)
+	print big
+	assert big.size() < 2 * sum([len(f) for f in forms]) and all([f in big for f in forms]), "Packed trie"
+	assert big.states() == 6, "Minimal DAWG"
+	assert big.keys() == tuple(sorted(forms)), "Perfect hashing"
+	for i, f in enumerate(sorted(forms)):
+		assert big.prefixes(f)[0][-1] == (len(f), i), "Perfect hashing"
+	assert spelled(big, big.prefixes(u"kalanx")) == ([(2, u"ka"), (4, u"kala"), (5, u"kalan")], 5), "Perfect hashing"
+	assert DoubleArrayTrie([u"tap", u"taps", u"top", u"tops"]).states() == 5, "Minimal DAWG"
+
+	m = Trie(keys)
+	print m
+	assert len(m) == 8 and m.keys() == t.keys() and m.prefixes(u"mi ala pona") == spelled(t, t.prefixes(u"mi ala pona")), "Mutable trie"
+	m.add(u"mi")
+	m.discard(u"mi ala")
+	m.discard(u"mo")
+	assert len(m) == 7 and u"mi ala" not in m and m.prefixes(u"mi ala pona") == ([(0, u""), (2, u"mi")], 2), "Mutable trie"
+	m.discard(u"")
+	m.add(u"mi alax")
+	assert m.prefixes(u"mi ala pona") == ([(2, u"mi")], 6) and u"mi alax" in m, "Mutable trie"
+	assert pickle.loads(pickle.dumps(m, -1)).keys() == m.keys(), "Mutable trie pickling"
+	for k in m.keys():
+		m.discard(k)
+	assert len(m) == 0 and m.prefixes(u"mi") == ([], 0), "Empty mutable trie"
+
+if __name__ == "__main__":
+	run()